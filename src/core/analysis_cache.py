@@ -0,0 +1,141 @@
+# analysis_cache.py
+import hashlib
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from datetime import date
+
+
+class AnalysisCache:
+    """两级分析结果缓存：内存 LRU + SQLite 磁盘层，均带 TTL
+
+    键由规范化后的输入文本和参考日期（提示词中“今天”对应的日期）组成，
+    因此同一段文本在同一天内只会请求一次 API，程序重启后依然有效。
+    """
+
+    def __init__(self, db_file="analysis_cache.db", max_entries=256,
+                 ttl=7 * 24 * 3600, disk_max_entries=5000):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.disk_max_entries = disk_max_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self.conn = None
+        if db_file:
+            try:
+                self.conn = sqlite3.connect(db_file, check_same_thread=False)
+                self.conn.execute("PRAGMA journal_mode=WAL")
+                self.conn.execute("""
+                    CREATE TABLE IF NOT EXISTS analysis_cache (
+                        key TEXT PRIMARY KEY,
+                        response TEXT NOT NULL,
+                        created_at REAL NOT NULL,
+                        accessed_at REAL NOT NULL
+                    )
+                """)
+                self.conn.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_analysis_cache_accessed ON analysis_cache (accessed_at)"
+                )
+                self.conn.commit()
+            except sqlite3.Error as e:
+                print(f"打开分析缓存失败，仅使用内存缓存: {str(e)}")
+                self.conn = None
+
+    @staticmethod
+    def normalize_text(text):
+        """统一全角/半角并合并空白，使仅有排版差异的文本命中同一缓存项"""
+        return " ".join(unicodedata.normalize("NFKC", text).split())
+
+    @classmethod
+    def make_key(cls, text, reference_date=None):
+        reference_date = reference_date or date.today()
+        raw = f"{reference_date.isoformat()}\n{cls.normalize_text(text)}"
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                response, created_at = entry
+                if now - created_at < self.ttl:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    self.memory_hits += 1
+                    return response
+                del self._memory[key]
+
+            if self.conn is not None:
+                try:
+                    row = self.conn.execute(
+                        "SELECT response, created_at FROM analysis_cache WHERE key = ?", (key,)
+                    ).fetchone()
+                    if row and now - row[1] < self.ttl:
+                        with self.conn:
+                            self.conn.execute(
+                                "UPDATE analysis_cache SET accessed_at = ? WHERE key = ?", (now, key)
+                            )
+                        self._remember(key, row[0], row[1])
+                        self.hits += 1
+                        self.disk_hits += 1
+                        return row[0]
+                except sqlite3.Error as e:
+                    print(f"读取分析缓存失败: {str(e)}")
+
+            self.misses += 1
+            return None
+
+    def put(self, key, response):
+        now = time.time()
+        with self._lock:
+            self._remember(key, response, now)
+            if self.conn is None:
+                return
+            try:
+                with self.conn:
+                    self.conn.execute(
+                        "INSERT OR REPLACE INTO analysis_cache (key, response, created_at, accessed_at) "
+                        "VALUES (?, ?, ?, ?)",
+                        (key, response, now, now)
+                    )
+                    self._prune_disk(now)
+            except sqlite3.Error as e:
+                print(f"写入分析缓存失败: {str(e)}")
+
+    def _remember(self, key, response, created_at):
+        self._memory[key] = (response, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _prune_disk(self, now):
+        self.conn.execute("DELETE FROM analysis_cache WHERE created_at < ?", (now - self.ttl,))
+        self.conn.execute("""
+            DELETE FROM analysis_cache WHERE key IN (
+                SELECT key FROM analysis_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+            )
+        """, (self.disk_max_entries,))
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+            }
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
@@ -1,19 +1,88 @@
 # api_handler.py
 import os
 import json
-import hashlib
-from datetime import datetime, timedelta
-from openai import OpenAI
+import threading
+from datetime import date, datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+import httpx
+from openai import OpenAI, APIConnectionError, APIStatusError
 from concurrent.futures import ThreadPoolExecutor
+from core.analysis_cache import AnalysisCache
+from core import completion
+from core.batching import AnalysisBatcher
+from core.local_extractor import LocalEventExtractor
+from core.resilience import CircuitBreaker, RetryPolicy, TokenBucket, call_with_resilience
 
 executor = ThreadPoolExecutor(max_workers=4)
 
+# 被同一来源的新请求取代时，回调收到的失败信息
+CANCELLED_MESSAGE = "请求已被新的请求取代"
+
+# 熔断期间且本地无法处理时，回调收到的失败信息
+UNAVAILABLE_MESSAGE = "API 服务暂时不可用，请稍后重试"
+
+DEFAULT_BASE_URL = "https://api.deepseek.com/v1"
+
+# 投机预分析使用的 channel：新的预分析会取代尚未开始的旧预分析
+PREFETCH_CHANNEL = "prefetch"
+
 class APIClient:
-    def __init__(self, api_key_file="api_key.json"):
+    def __init__(self, api_key_file="api_key.json", cache_file="analysis_cache.db",
+                 batching=False, batch_window=0.3, max_batch_size=8, streaming=False,
+                 local_fast_path=True, local_confidence=0.8,
+                 base_url=DEFAULT_BASE_URL, timeout=60.0, connect_timeout=5.0,
+                 max_connections=8, max_attempts=4, rate_limit=2.0, rate_burst=4,
+                 breaker_threshold=5, breaker_reset=30.0,
+                 async_engine=False, async_concurrency=64,
+                 async_rate_limit=None, async_rate_burst=None):
         self.api_key_file = api_key_file
+        self.base_url = base_url
         self.client = None
-        self.last_prompt_hash = None
-        self.cached_response = None
+        self.api_key = None
+        # 所有 OpenAI 客户端共用一个带 keep-alive 的连接池，更换密钥也不会重建连接
+        self.http_client = httpx.Client(
+            timeout=httpx.Timeout(timeout, connect=connect_timeout),
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+                keepalive_expiry=120.0,
+            ),
+        )
+        self.cache = AnalysisCache(cache_file)
+        # 429/5xx/无效 JSON 时退避重试；客户端令牌桶限流；连续失败后熔断，
+        # 熔断期间直接使用缓存或本地抽取结果，不再请求 API
+        self.retry_policy = RetryPolicy(max_attempts=max_attempts)
+        self.rate_limiter = TokenBucket(rate_limit, rate_burst) if rate_limit else None
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_reset)
+        self.fallback_hits = 0
+        # 本地规则抽取：置信度达到 local_confidence 的简单输入不再请求 API
+        self.local_extractor = LocalEventExtractor() if local_fast_path else None
+        self.local_confidence = local_confidence
+        self.local_hits = 0
+        # 流式模式：调用方提供 on_event 时，每解析出一个完整事件就立即回调
+        self.streaming = streaming
+        # 批量模式：短时间内的多段文本合并为一次 API 请求
+        self.batcher = None
+        if batching:
+            self.batcher = AnalysisBatcher(
+                executor, self._send_batch, window=batch_window, max_batch=max_batch_size
+            )
+        # 进行中的请求 {缓存键: {"future": Future, "callbacks": [回调]}}，相同请求共享一个 Future
+        self._inflight = {}
+        # 每个来源(channel)最近一次请求的 (缓存键, 回调)
+        self._channels = {}
+        # 取消 Future 会同步触发其完成回调，回调中需要再次获取该锁
+        self._inflight_lock = threading.RLock()
+        # 异步引擎：请求在独立的事件循环线程中并发执行，不再受线程池大小限制；
+        # 其限流由 async_rate_limit 单独指定（默认不限），不使用上面的 rate_limit
+        self.async_engine = None
+        if async_engine:
+            from core.async_engine import AsyncAnalysisEngine
+            self.async_engine = AsyncAnalysisEngine(
+                self, concurrency=async_concurrency,
+                rate_limit=async_rate_limit, rate_burst=async_rate_burst,
+                timeout=timeout, connect_timeout=connect_timeout,
+            )
         self.load_api_key()
 
     def load_api_key(self):
@@ -22,15 +91,42 @@ class APIClient:
                 with open(self.api_key_file, 'r', encoding='utf-8') as f:
                     data = json.load(f)
                     if 'api_key' in data:
-                        self.client = OpenAI(
-                            api_key=data['api_key'],
-                            base_url="https://api.deepseek.com/v1"
-                        )
+                        self._use_api_key(data['api_key'])
                         return data['api_key']
         except Exception as e:
             print(f"加载API密钥失败: {str(e)}")
         return None
 
+    def _create_client(self, api_key):
+        # 重试由 call_with_resilience 统一处理，关闭 SDK 自带的重试
+        return OpenAI(api_key=api_key, base_url=self.base_url, http_client=self.http_client,
+                      max_retries=0)
+
+    def _use_api_key(self, api_key, client=None):
+        """切换到指定密钥；密钥未变化时复用现有客户端"""
+        if self.client is not None and api_key == self.api_key:
+            return
+        self.client = client or self._create_client(api_key)
+        self.api_key = api_key
+
+    def set_api_key(self, api_key):
+        """直接使用指定密钥（不验证也不保存），如命令行传入的密钥"""
+        self._use_api_key(api_key)
+
+    def warm_up(self):
+        """在后台预先建立到 API 的 TLS 连接，首次分析时无需再握手"""
+        if self.client is None:
+            return
+        client = self.client
+
+        def _warm_up():
+            try:
+                client.models.list()
+            except Exception as e:
+                print(f"预热 API 连接失败: {str(e)}")
+
+        executor.submit(_warm_up)
+
     def save_api_key(self, api_key):
         try:
             with open(self.api_key_file, 'w', encoding='utf-8') as f:
@@ -41,18 +137,17 @@ class APIClient:
             return False
 
     def update_api_key(self, new_key):
+        """验证并保存新密钥（阻塞，需在后台线程调用，见 update_api_key_async）"""
         if new_key:
             try:
-                self.client = OpenAI(
-                    api_key=new_key,
-                    base_url="https://api.deepseek.com/v1"
-                )
-                test_response = self.client.chat.completions.create(
+                candidate = self._create_client(new_key)
+                test_response = candidate.chat.completions.create(
                     model="deepseek-chat",
                     messages=[{"role": "user", "content": "测试"}],
                     max_tokens=5
                 )
                 if test_response.choices:
+                    self._use_api_key(new_key, candidate)
                     self.save_api_key(new_key)
                     return True, "API 密钥更新成功"
                 else:
@@ -61,6 +156,42 @@ class APIClient:
                 return False, f"API 密钥验证失败: {str(e)}"
         return False, "API 密钥不能为空"
 
+    def update_api_key_async(self, new_key, callback):
+        """在工作线程中验证密钥，完成后调用 callback(success, message)"""
+        future = executor.submit(self.update_api_key, new_key)
+        future.add_done_callback(lambda f: callback(*f.result()))
+
+    def close(self):
+        """释放连接池、事件循环线程和缓存数据库"""
+        if self.batcher is not None:
+            self.batcher.flush()
+        if self.async_engine is not None:
+            self.async_engine.close()
+        self.http_client.close()
+        self.cache.close()
+
+    def _prompt_rules(self):
+        return f"""处理规则：
+1. 多项活动处理：
+   - 当文本中出现"然后"、"接着"、"之后"等连接词时，视为多个独立事件
+   - 每个事件必须有明确的时间或顺序指示
+   - 当文本出现"即日起至n月m日"则视为今天至n月m日每天都有的独立事件
+   - 当文本出现"周x至周y"等星期段则视为该星期段的每一天都有的独立事件
+
+2. 模糊时间处理：
+   - "今天" = {datetime.now().strftime('%Y-%m-%d')}
+   - "明天" = {(datetime.now() + timedelta(days=1)).strftime('%Y-%m-%d')}
+   - "后天" = {(datetime.now() + timedelta(days=2)).strftime('%Y-%m-%d')}
+   - "上午" = "06:00-11:00"
+   - "中午" = "11:00-13:00"
+   - "下午" = "13:00-17:00"
+   - "晚上" = "17:00-24:00"
+   - "凌晨" = "24:00-06:00"
+
+3. 地点处理：
+   - 没有明确地点时使用"未指定"
+   - 模糊地点如"会议室"保持原样"""
+
     def _build_prompt(self, text):
         return f"""请从以下文本中提取所有事件信息，并以严格的JSON格式输出。输出必须是有效的JSON对象，包含一个"events"数组，每个事件必须包含独立的日期、地点、时间和事项字段。
 
@@ -82,83 +213,308 @@ class APIClient:
     ]
 }}
 
-处理规则：
-1. 多项活动处理：
-   - 当文本中出现"然后"、"接着"、"之后"等连接词时，视为多个独立事件
-   - 每个事件必须有明确的时间或顺序指示
-   - 当文本出现"即日起至n月m日"则视为今天至n月m日每天都有的独立事件
-   - 当文本出现"周x至周y"等星期段则视为该星期段的每一天都有的独立事件
+{self._prompt_rules()}
 
-2. 模糊时间处理：
-   - "今天" = {datetime.now().strftime('%Y-%m-%d')}
-   - "明天" = {(datetime.now() + timedelta(days=1)).strftime('%Y-%m-%d')}
-   - "后天" = {(datetime.now() + timedelta(days=2)).strftime('%Y-%m-%d')}
-   - "上午" = "06:00-11:00"
-   - "中午" = "11:00-13:00"
-   - "下午" = "13:00-17:00"
-   - "晚上" = "17:00-24:00"
-   - "凌晨" = "24:00-06:00"
+待分析文本：
+{text}"""
 
-3. 地点处理：
-   - 没有明确地点时使用"未指定"
-   - 模糊地点如"会议室"保持原样
+    def _build_batch_prompt(self, snippets):
+        """构建一次分析多段文本的提示词，snippets 为 [(编号, 文本)]"""
+        snippet_text = "\n\n".join(
+            f"【片段 {snippet_id}】\n{text}" for snippet_id, text in snippets
+        )
+        return f"""下面有多段相互独立的文本，请分别从每段文本中提取所有事件信息，并以严格的JSON格式输出。输出必须是有效的JSON对象，包含一个"results"数组，每一项对应一段文本，包含该段的编号"id"和该段的"events"数组；每个事件必须包含独立的日期、地点、时间和事项字段。没有事件的文本也要输出空的"events"数组。
+
+输出JSON示例：
+{{
+    "results": [
+        {{
+            "id": "1",
+            "events": [
+                {{
+                    "日期": "2023-10-05",
+                    "地点": "会议室",
+                    "时间": "14:00",
+                    "事项": "项目会议"
+                }}
+            ]
+        }},
+        {{
+            "id": "2",
+            "events": []
+        }}
+    ]
+}}
+
+{self._prompt_rules()}
 
 待分析文本：
-{text}"""
+{snippet_text}"""
 
-    def analyze_text_async(self, text, callback):
-        if not self.client:
-            callback(False, "请先设置有效的API密钥")
+    def analyze_text_async(self, text, callback, channel=None, on_event=None):
+        """异步分析文本，完成后调用 callback(success, result)
+
+        与进行中的相同请求共享同一次 API 调用；指定 channel 时，同一来源尚未完成的
+        上一个请求被取代：其回调收到 CANCELLED_MESSAGE，若还在排队则直接取消。
+        流式模式下（且未启用批量模式）会在工作线程中对每个已解析完成的事件对象
+        调用 on_event(event)，最终结果仍通过 callback 返回。
+        启用异步引擎时交由 AsyncAnalysisEngine 处理，行为相同（不使用批量模式）。
+        """
+        if self.async_engine is not None:
+            self.async_engine.analyze_text_async(text, callback, channel, on_event)
             return
 
-        current_prompt = self._build_prompt(text)
-        current_hash = hashlib.md5(current_prompt.encode('utf-8')).hexdigest()
-        
-        if current_hash == self.last_prompt_hash and self.cached_response:
-            callback(True, self.cached_response)
+        outcome, cache_key = self.resolve_without_api(text)
+        if outcome is not None:
+            callback(*outcome)
             return
 
-        future = executor.submit(self._async_analyze_text, current_prompt, current_hash)
-        future.add_done_callback(lambda f: self._on_analysis_complete(f, callback))
+        with self._inflight_lock:
+            superseded = self._supersede(channel) if channel else []
+            if channel:
+                self._channels[channel] = (cache_key, callback)
+
+            entry = self._inflight.get(cache_key)
+            if entry is not None:
+                entry["callbacks"].append(callback)
+                future = None
+            else:
+                if self.batcher is not None:
+                    future = self.batcher.submit(cache_key, text)
+                elif self.streaming and on_event is not None:
+                    current_prompt = self._build_prompt(text)
+                    future = executor.submit(
+                        self._async_stream_text, current_prompt, cache_key,
+                        self._stream_guard(channel, callback, on_event)
+                    )
+                else:
+                    current_prompt = self._build_prompt(text)
+                    future = executor.submit(self._async_analyze_text, current_prompt, cache_key)
+                self._inflight[cache_key] = {"future": future, "callbacks": [callback]}
+
+        for cancelled_callback in superseded:
+            cancelled_callback(False, CANCELLED_MESSAGE)
+        if future is not None:
+            future.add_done_callback(lambda f: self._on_analysis_complete(f, cache_key))
+
+    def _stream_guard(self, channel, callback, on_event):
+        """请求被同一来源的新请求取代后，不再把流式事件转发给调用方"""
+        if not channel:
+            return on_event
+
+        def guarded(event):
+            current = self._channels.get(channel)
+            if current is not None and current[1] is callback:
+                on_event(event)
+        return guarded
+
+    def prefetch(self, text, budget=None, callback=None):
+        """投机预分析：提前请求 API，结果写入缓存
+
+        之后对同一文本调用 analyze_text_async 时直接命中缓存，或加入仍在进行的请求。
+        本地可解析或已缓存时无需预分析；需要请求 API 时先从 budget(TokenBucket)
+        取令牌，取不到则放弃。返回 "resolved"、"failed"、"budget" 或 "started"，
+        发起请求时完成后调用 callback(success, result)。
+        """
+        outcome, _ = self.resolve_without_api(text)
+        if outcome is not None:
+            return "resolved" if outcome[0] else "failed"
+        if budget is not None and not budget.try_acquire():
+            return "budget"
+        self.analyze_text_async(
+            text, callback or (lambda success, result: None), channel=PREFETCH_CHANNEL
+        )
+        return "started"
+
+    def resolve_without_api(self, text):
+        """依次尝试本地抽取、缓存和熔断退回，不请求 API
+
+        返回 (结果, 缓存键)：结果为 (成功, 内容) 时直接采用，为 None 时需要请求 API。
+        """
+        local_response = None
+        if self.local_extractor is not None:
+            response, confidence = self.local_extractor.extract_json(text)
+            if confidence >= self.local_confidence:
+                self.local_hits += 1
+                return (True, response), None
+            if confidence > 0:
+                local_response = response
+
+        if not self.client:
+            return (False, "请先设置有效的API密钥"), None
+
+        # 提示词中包含今天的日期，缓存键使用规范化文本 + 参考日期
+        cache_key = self.cache.make_key(text, date.today())
+        cached_response = self.cache.get(cache_key)
+        if cached_response is not None:
+            return (True, cached_response), cache_key
+
+        if self.breaker.is_open():
+            # 上游不健康时不再排队等待，退回置信度较低的本地结果
+            if local_response is not None:
+                self.fallback_hits += 1
+                return (True, local_response), cache_key
+            return (False, UNAVAILABLE_MESSAGE), cache_key
+        return None, cache_key
+
+    def _supersede(self, channel):
+        """取消某来源的上一个请求（需持有 _inflight_lock），返回需要通知的回调"""
+        previous = self._channels.pop(channel, None)
+        if previous is None:
+            return []
+        cache_key, callback = previous
+        entry = self._inflight.get(cache_key)
+        if entry is None or callback not in entry["callbacks"]:
+            return []
+        entry["callbacks"].remove(callback)
+        # 没有其他调用方等待且尚未开始执行时直接取消；已在执行的请求结果仍会写入缓存
+        if not entry["callbacks"] and entry["future"].cancel():
+            self._inflight.pop(cache_key, None)
+        return [callback]
 
-    def _async_analyze_text(self, prompt, prompt_hash):
+    def pending_requests(self):
+        """进行中（含排队）的不同请求数"""
+        if self.async_engine is not None:
+            return self.async_engine.pending_requests()
+        with self._inflight_lock:
+            return len(self._inflight)
+
+    def _async_analyze_text(self, prompt, cache_key):
         try:
             response = self._call_api_with_prompt(prompt)
-            return (response, prompt_hash)
+            return (response, cache_key)
         except Exception as e:
             return e
 
-    def _call_api_with_prompt(self, prompt):
+    def _async_stream_text(self, prompt, cache_key, on_event):
+        try:
+            response = self._call_api_streaming(prompt, on_event)
+            return (response, cache_key)
+        except Exception as e:
+            return e
+
+    @staticmethod
+    def _is_retryable(error):
+        """限流、服务端错误、网络错误和无效 JSON 可以重试；401/400 等不重试"""
+        if isinstance(error, APIStatusError):
+            return error.status_code == 429 or error.status_code >= 500
+        return isinstance(error, (APIConnectionError, ValueError))
+
+    @staticmethod
+    def _retry_after(error):
+        """从响应头读取服务端要求的等待秒数"""
+        response = getattr(error, "response", None)
+        if response is None:
+            return None
+        headers = response.headers
+        try:
+            if headers.get("retry-after-ms"):
+                return float(headers["retry-after-ms"]) / 1000
+            value = headers.get("retry-after")
+            if not value:
+                return None
+            try:
+                return float(value)
+            except ValueError:
+                # HTTP 日期格式
+                return (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds()
+        except (TypeError, ValueError):
+            return None
+
+    def resilience_kwargs(self, emitted=None):
+        """call_with_resilience 的重试和熔断参数（限流器由调用方指定）
+
+        emitted 为流式请求的已输出标记（见 completion.track_emitted），非空时不再重试；
+        是否计入熔断始终按错误类型判断，与本次是否重试无关。
+        """
+        is_retryable = self._is_retryable
+        if emitted is not None:
+            is_retryable = lambda e: not emitted and self._is_retryable(e)
+        return {
+            "retry_policy": self.retry_policy,
+            "breaker": self.breaker,
+            "is_retryable": is_retryable,
+            "retry_after_of": self._retry_after,
+            "is_failure": self._is_retryable,
+        }
+
+    def request_kwargs(self, text, stream=False):
+        """分析单段文本的补全请求参数"""
+        return completion.request_kwargs(self._build_prompt(text), stream=stream)
+
+    def _call_resilient(self, func, emitted=None):
+        return call_with_resilience(
+            func, rate_limiter=self.rate_limiter, **self.resilience_kwargs(emitted)
+        )
+
+    def _call_api_streaming(self, prompt, on_event, max_tokens=2000):
+        """流式请求，边接收边增量解析 events 数组，返回完整的 JSON 文本"""
+        emit, emitted = completion.track_emitted(on_event)
+        return self._call_resilient(
+            lambda: self._request_streaming(prompt, emit, max_tokens), emitted
+        )
+
+    def _request_streaming(self, prompt, on_event, max_tokens):
+        stream = self.client.chat.completions.create(
+            **completion.request_kwargs(prompt, max_tokens, stream=True)
+        )
+        accumulator = completion.StreamAccumulator(on_event)
+        for chunk in stream:
+            accumulator.feed(chunk)
+        return accumulator.result()
+
+    def _send_batch(self, snippets):
+        """一次请求分析多段文本，返回 {编号: 该段的 {"events": [...]} JSON 字符串}"""
+        if len(snippets) == 1:
+            snippet_id, text = snippets[0]
+            return {snippet_id: self._call_api_with_prompt(self._build_prompt(text))}
+
+        content = self._call_api_with_prompt(
+            self._build_batch_prompt(snippets),
+            max_tokens=min(8000, 2000 * len(snippets))
+        )
+        results = json.loads(content).get("results", [])
+        if isinstance(results, dict):
+            # 兼容以编号为键的输出
+            results = [dict(item, id=snippet_id) for snippet_id, item in results.items()]
+
+        responses = {}
+        for item in results:
+            if isinstance(item, dict) and "id" in item:
+                responses[str(item["id"])] = json.dumps(
+                    {"events": item.get("events", [])}, ensure_ascii=False
+                )
+        return responses
+
+    def _call_api_with_prompt(self, prompt, max_tokens=2000):
+        return self._call_resilient(lambda: self._request_completion(prompt, max_tokens))
+
+    def _request_completion(self, prompt, max_tokens):
         response = self.client.chat.completions.create(
-            model="deepseek-chat",
-            messages=[
-                {
-                    "role": "system", 
-                    "content": "你是一个专业的日历助手，能精确识别多项活动并以JSON格式输出结果。请确保输出是有效的JSON对象，包含'events'数组。"
-                },
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7,  # 降低温度以获得更稳定的JSON输出
-            max_tokens=2000,   # 增加token限制以防JSON被截断
-            stream=False,
-            response_format={"type": "json_object"},
+            **completion.request_kwargs(prompt, max_tokens)
         )
-        try:
-            # 验证返回的JSON是否有效
-            json.loads(response.choices[0].message.content)
-            return response.choices[0].message.content
-        except json.JSONDecodeError:
-            raise ValueError("API返回了无效的JSON格式")
+        return completion.completion_content(response)
+
+    def _on_analysis_complete(self, future, cache_key):
+        with self._inflight_lock:
+            entry = self._inflight.get(cache_key)
+            if entry is not None and entry["future"] is future:
+                del self._inflight[cache_key]
+                callbacks = entry["callbacks"]
+            else:
+                callbacks = []
+        if future.cancelled():
+            return
 
-    def _on_analysis_complete(self, future, callback):
         try:
             result = future.result()
             if isinstance(result, Exception):
                 raise result
             
-            response, prompt_hash = result
-            self.last_prompt_hash = prompt_hash
-            self.cached_response = response
-            callback(True, response)
+            response, cache_key = result
+            self.cache.put(cache_key, response)
+            outcome = (True, response)
         except Exception as e:
-            callback(False, f"分析失败: {str(e)}")
+            outcome = (False, f"分析失败: {str(e)}")
+        for callback in callbacks:
+            callback(*outcome)
@@ -0,0 +1,208 @@
+# async_engine.py
+import asyncio
+import itertools
+import threading
+
+import httpx
+from openai import AsyncOpenAI
+
+from core import completion
+from core.api_client import CANCELLED_MESSAGE
+from core.resilience import TokenBucket, call_with_resilience_async
+
+
+class AsyncAnalysisEngine:
+    """基于 asyncio 的分析引擎
+
+    在独立的事件循环线程中用 AsyncOpenAI 并发请求 API，并发数由信号量限制，
+    每个进行中的请求只占用一个协程而不是一个线程，适合批量重新分析大量文本。
+    提示词、请求参数和流式解析（core.completion）、缓存、本地抽取、重试和熔断
+    复用所属 APIClient 的设置；限流由 rate_limit
+    （每秒请求数，None 表示只受并发数限制）单独指定，不沿用界面客户端每秒 2 次的令牌桶。
+    本地抽取和缓存读写涉及 SQLite，在线程池中执行，不阻塞事件循环。
+
+    - analyze_text_async(text, callback, channel, on_event)：与 APIClient 相同的回调接口，
+      callback 在事件循环线程中调用
+    - await analyze(text) / await analyze_many(texts)：返回 (成功, 结果)，供无界面场景使用；
+      在其他线程中可用 run(engine.analyze_many(texts)) 同步等待
+    """
+
+    def __init__(self, api_client, concurrency=64, rate_limit=None, rate_burst=None,
+                 timeout=60.0, connect_timeout=5.0, pool_size=32):
+        self.api_client = api_client
+        self.concurrency = concurrency
+        self.rate_limiter = TokenBucket(rate_limit, rate_burst) if rate_limit else None
+        # httpcore 分配连接的开销随连接池大小平方增长，高并发时拆分为多个小连接池轮流使用
+        pool_count = max(1, -(-concurrency // pool_size))
+        per_pool = -(-concurrency // pool_count)
+        self.http_clients = [
+            httpx.AsyncClient(
+                timeout=httpx.Timeout(timeout, connect=connect_timeout),
+                limits=httpx.Limits(
+                    max_connections=per_pool,
+                    max_keepalive_connections=per_pool,
+                    keepalive_expiry=120.0,
+                ),
+            )
+            for _ in range(pool_count)
+        ]
+        self._clients = []
+        self._client_key = None
+        self._next_client = itertools.cycle(range(pool_count))
+        self._semaphore = asyncio.Semaphore(concurrency)
+        # 进行中的请求 {缓存键: {"task": Task, "waiters": 等待数}}，只在事件循环线程中访问
+        self._inflight = {}
+        # 每个来源(channel)最近一次请求的 Future
+        self._channels = {}
+        self._channels_lock = threading.Lock()
+        self.active = 0
+        self.peak_active = 0
+
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run_loop, name="analysis-loop", daemon=True)
+        self._thread.start()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def run(self, coro):
+        """在其他线程中提交协程到事件循环并阻塞等待结果"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def close(self):
+        if not self.loop.is_running():
+            return
+        try:
+            for http_client in self.http_clients:
+                self.run(http_client.aclose())
+        except Exception as e:
+            print(f"关闭异步连接池失败: {str(e)}")
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=5)
+
+    def pending_requests(self):
+        return len(self._inflight)
+
+    def analyze_text_async(self, text, callback, channel=None, on_event=None):
+        submitted = []
+        if on_event is not None:
+            raw_on_event = on_event
+
+            def on_event(event):
+                # 已被取代（Future 已取消）的请求不再转发流式事件
+                if not (submitted and submitted[0].cancelled()):
+                    raw_on_event(event)
+
+        future = asyncio.run_coroutine_threadsafe(self.analyze(text, on_event), self.loop)
+        submitted.append(future)
+        previous = None
+        if channel:
+            with self._channels_lock:
+                previous = self._channels.get(channel)
+                self._channels[channel] = future
+        if previous is not None:
+            # 取消被取代的请求；若其他调用方也在等待同一请求，则请求继续执行
+            previous.cancel()
+
+        def _done(f):
+            if channel:
+                with self._channels_lock:
+                    if self._channels.get(channel) is f:
+                        del self._channels[channel]
+            if f.cancelled():
+                callback(False, CANCELLED_MESSAGE)
+            else:
+                callback(*f.result())
+
+        future.add_done_callback(_done)
+
+    async def analyze(self, text, on_event=None):
+        """分析一段文本，返回 (成功, JSON 文本或错误信息)"""
+        api = self.api_client
+        outcome, cache_key = await asyncio.to_thread(api.resolve_without_api, text)
+        if outcome is not None:
+            return outcome
+        try:
+            response = await self._fetch_shared(text, cache_key, on_event)
+            return True, response
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            return False, f"分析失败: {str(e)}"
+
+    async def analyze_many(self, texts):
+        """并发分析多段文本，按输入顺序返回 [(成功, 结果)]"""
+        return await asyncio.gather(*(self.analyze(text) for text in texts))
+
+    async def _fetch_shared(self, text, cache_key, on_event):
+        """相同请求共享一个任务；所有等待方都取消后才取消任务本身"""
+        entry = self._inflight.get(cache_key)
+        if entry is None:
+            entry = {"task": self.loop.create_task(self._fetch(text, cache_key, on_event)), "waiters": 0}
+            self._inflight[cache_key] = entry
+            entry["task"].add_done_callback(lambda task: self._forget(cache_key, entry))
+        entry["waiters"] += 1
+        try:
+            return await asyncio.shield(entry["task"])
+        finally:
+            entry["waiters"] -= 1
+            if not entry["waiters"] and not entry["task"].done():
+                entry["task"].cancel()
+
+    def _forget(self, cache_key, entry):
+        if self._inflight.get(cache_key) is entry:
+            del self._inflight[cache_key]
+
+    def _get_client(self):
+        api = self.api_client
+        if not self._clients or self._client_key != api.api_key:
+            self._clients = [
+                AsyncOpenAI(
+                    api_key=api.api_key, base_url=api.base_url,
+                    http_client=http_client, max_retries=0,
+                )
+                for http_client in self.http_clients
+            ]
+            self._client_key = api.api_key
+        return self._clients[next(self._next_client)]
+
+    async def _fetch(self, text, cache_key, on_event):
+        api = self.api_client
+        async with self._semaphore:
+            self.active += 1
+            self.peak_active = max(self.peak_active, self.active)
+            try:
+                client = self._get_client()
+                if api.streaming and on_event is not None:
+                    response = await self._call_streaming(client, text, on_event)
+                else:
+                    request = api.request_kwargs(text)
+                    response = await self._call(lambda: self._request_completion(client, request))
+            finally:
+                self.active -= 1
+        await asyncio.to_thread(api.cache.put, cache_key, response)
+        return response
+
+    def _call(self, func, emitted=None):
+        return call_with_resilience_async(
+            func, rate_limiter=self.rate_limiter, **self.api_client.resilience_kwargs(emitted)
+        )
+
+    @staticmethod
+    async def _request_completion(client, request):
+        response = await client.chat.completions.create(**request)
+        return completion.completion_content(response)
+
+    async def _call_streaming(self, client, text, on_event):
+        request = self.api_client.request_kwargs(text, stream=True)
+        emit, emitted = completion.track_emitted(on_event)
+        return await self._call(lambda: self._request_streaming(client, request, emit), emitted)
+
+    @staticmethod
+    async def _request_streaming(client, request, on_event):
+        stream = await client.chat.completions.create(**request)
+        accumulator = completion.StreamAccumulator(on_event)
+        async for chunk in stream:
+            accumulator.feed(chunk)
+        return accumulator.result()
@@ -0,0 +1,75 @@
+# batching.py
+import threading
+from concurrent.futures import Future
+
+
+class AnalysisBatcher:
+    """把短时间内到达的多段文本合并成一次请求
+
+    submit() 立即返回 Future；第一段文本到达后等待 window 秒（或攒满 max_batch 段），
+    然后在 executor 中调用 send_batch([(编号, 文本)])，它应返回 {编号: 结果}。
+    每个 Future 的结果为 (结果, key)，与 APIClient 单次请求的返回值格式一致。
+    """
+
+    def __init__(self, executor, send_batch, window=0.3, max_batch=8):
+        self.executor = executor
+        self.send_batch = send_batch
+        self.window = window
+        self.max_batch = max_batch
+        self._pending = []
+        self._timer = None
+        self._lock = threading.Lock()
+        self.batches_sent = 0
+        self.snippets_sent = 0
+
+    def submit(self, key, text):
+        future = Future()
+        with self._lock:
+            self._pending.append((key, text, future))
+            if len(self._pending) >= self.max_batch:
+                batch = self._take_pending()
+            else:
+                batch = None
+                if self._timer is None:
+                    self._timer = threading.Timer(self.window, self.flush)
+                    self._timer.daemon = True
+                    self._timer.start()
+        if batch:
+            self.executor.submit(self._run_batch, batch)
+        return future
+
+    def flush(self):
+        """立即发送当前累积的文本"""
+        with self._lock:
+            batch = self._take_pending()
+        if batch:
+            self.executor.submit(self._run_batch, batch)
+
+    def _take_pending(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        return batch
+
+    def _run_batch(self, batch):
+        # 已被取消的请求（如被新的选中文本取代）不再发送
+        batch = [item for item in batch if item[2].set_running_or_notify_cancel()]
+        if not batch:
+            return
+
+        snippets = [(str(index), text) for index, (_, text, _) in enumerate(batch, 1)]
+        try:
+            results = self.send_batch(snippets)
+        except Exception as e:
+            for _, _, future in batch:
+                future.set_exception(e)
+            return
+
+        self.batches_sent += 1
+        self.snippets_sent += len(batch)
+        for (snippet_id, _), (key, _, future) in zip(snippets, batch):
+            if snippet_id in results:
+                future.set_result((results[snippet_id], key))
+            else:
+                future.set_exception(ValueError(f"批量分析结果中缺少片段 {snippet_id}"))
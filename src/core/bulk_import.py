@@ -0,0 +1,175 @@
+# bulk_import.py
+"""无界面批量导入：并发分析文本文件并把事件一次性写入日历
+
+用法（在 src 目录下）：
+    python -m core.bulk_import notes.txt exports/ --parallelism 32
+    python -m core.bulk_import mails/ --mode lines --base-url http://127.0.0.1:8765/v1 --api-key stub
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import sys
+import time
+
+from core.api_client import APIClient, DEFAULT_BASE_URL
+from core.event_manager import EventManager
+from core.models import Event
+
+
+def iter_files(paths, suffixes):
+    """展开输入路径，目录按文件名顺序递归遍历"""
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    if name.lower().endswith(suffixes):
+                        yield os.path.join(root, name)
+        else:
+            yield path
+
+
+def iter_snippets(paths, mode="paragraphs", encoding="utf-8", suffixes=(".txt", ".md", ".eml", ".log")):
+    """逐行读取文件，按行或按空行分隔的段落产出待分析文本，不把整个文件读入内存"""
+    for file_path in iter_files(paths, suffixes):
+        try:
+            with open(file_path, 'r', encoding=encoding, errors='replace') as f:
+                paragraph = []
+                for line in f:
+                    line = line.strip()
+                    if mode == "lines":
+                        if line:
+                            yield line
+                    elif line:
+                        paragraph.append(line)
+                    elif paragraph:
+                        yield "\n".join(paragraph)
+                        paragraph = []
+                if paragraph:
+                    yield "\n".join(paragraph)
+        except OSError as e:
+            print(f"读取文件失败 {file_path}: {str(e)}", file=sys.stderr)
+
+
+class BulkImporter:
+    """通过 APIClient 的异步引擎并发分析文本，收集事件后一次性写入 EventManager"""
+
+    def __init__(self, api_handler, event_manager, parallelism=32):
+        self.api_handler = api_handler
+        self.event_manager = event_manager
+        self.parallelism = parallelism
+        self.events = []
+        self.latencies = []
+        self.snippets = 0
+        self.failures = 0
+        self.elapsed = 0.0
+
+    async def _analyze_one(self, text):
+        start = time.perf_counter()
+        success, result = await self.api_handler.async_engine.analyze(text)
+        self.latencies.append(time.perf_counter() - start)
+        if not success:
+            self.failures += 1
+            print(f"分析失败: {text[:30]!r}: {result}", file=sys.stderr)
+            return
+        try:
+            self.events.extend(Event.from_api_response(result))
+        except (ValueError, TypeError, KeyError) as e:
+            # 如 {"events": null} 或事件不是对象
+            self.failures += 1
+            print(f"解析结果失败: {text[:30]!r}: {str(e)}", file=sys.stderr)
+
+    async def _run(self, snippets):
+        # 只保留有限数量的进行中任务，输入文件再大也不会一次性全部读入；
+        # 读文件在线程池中分块进行，不阻塞事件循环
+        snippets = iter(snippets)
+        pending = set()
+        while True:
+            chunk = await asyncio.to_thread(list, itertools.islice(snippets, self.parallelism))
+            if not chunk:
+                break
+            for text in chunk:
+                self.snippets += 1
+                if len(pending) >= self.parallelism * 2:
+                    _, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                pending.add(asyncio.ensure_future(self._analyze_one(text)))
+        if pending:
+            await asyncio.wait(pending)
+
+    def run(self, snippets, save=True):
+        """分析全部文本；返回 (新增事件数, 重复事件数)"""
+        start = time.perf_counter()
+        self.api_handler.async_engine.run(self._run(snippets))
+        added, duplicates = self.event_manager.add_events(self.events)
+        if save and added:
+            self.event_manager.save_events_to_log()
+        self.elapsed = time.perf_counter() - start
+        return added, duplicates
+
+    def report(self, added, duplicates):
+        api = self.api_handler
+        latencies = sorted(self.latencies)
+
+        def percentile(p):
+            if not latencies:
+                return 0.0
+            return latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000
+
+        print(f"文本片段: {self.snippets}，失败: {self.failures}")
+        print(f"本地解析: {api.local_hits}，缓存命中: {api.cache.hits}，"
+              f"熔断退回: {api.fallback_hits}，最大并发请求: {api.async_engine.peak_active}")
+        print(f"提取事件: {len(self.events)}，新增: {added}，重复: {duplicates}")
+        throughput = self.snippets / self.elapsed if self.elapsed else 0.0
+        print(f"耗时: {self.elapsed:.2f}s，吞吐量: {throughput:.1f} 段/秒")
+        print(f"延迟: p50 {percentile(0.5):.0f}ms，p95 {percentile(0.95):.0f}ms，"
+              f"最大 {percentile(1.0):.0f}ms")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="批量分析文本文件并导入日历事件")
+    parser.add_argument("paths", nargs="+", help="输入文件或目录")
+    parser.add_argument("--mode", choices=("paragraphs", "lines"), default="paragraphs",
+                        help="按空行分隔的段落或按行切分文本")
+    parser.add_argument("--parallelism", type=int, default=32, help="并发请求数")
+    parser.add_argument("--encoding", default="utf-8")
+    parser.add_argument("--log-file", default="calendar_events.log", help="日历事件存储文件")
+    parser.add_argument("--api-key", help="API 密钥，默认读取 api_key.json")
+    parser.add_argument("--api-key-file", default="api_key.json")
+    parser.add_argument("--base-url", default=DEFAULT_BASE_URL, help="API 地址，可指向本地桩服务")
+    parser.add_argument("--rate-limit", type=float, default=0,
+                        help="每秒最多请求数，0 表示只受 --parallelism 限制")
+    parser.add_argument("--rate-burst", type=int, default=None,
+                        help="限流时允许的突发请求数，默认等于每秒请求数")
+    parser.add_argument("--no-local", action="store_true", help="不使用本地规则抽取")
+    parser.add_argument("--dry-run", action="store_true", help="只分析不保存")
+    args = parser.parse_args(argv)
+
+    api_handler = APIClient(
+        api_key_file=args.api_key_file,
+        base_url=args.base_url,
+        local_fast_path=not args.no_local,
+        async_engine=True,
+        async_concurrency=args.parallelism,
+        async_rate_limit=args.rate_limit or None,
+        async_rate_burst=args.rate_burst,
+    )
+    if args.api_key:
+        api_handler.set_api_key(args.api_key)
+    if api_handler.client is None:
+        print("未设置API密钥，只能处理本地可解析的文本", file=sys.stderr)
+
+    event_manager = EventManager(args.log_file, lazy=True)
+    importer = BulkImporter(api_handler, event_manager, args.parallelism)
+    try:
+        added, duplicates = importer.run(
+            iter_snippets(args.paths, args.mode, args.encoding), save=not args.dry_run
+        )
+        importer.report(added, duplicates)
+    finally:
+        api_handler.close()
+    return 1 if importer.failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+# completion.py
+"""线程池客户端(APIClient)与异步引擎(AsyncAnalysisEngine)共用的补全请求构造和结果处理
+
+两者只负责发送请求，模型、提示词格式、参数和流式解析都在这里，避免两边各自修改后不一致。
+"""
+import json
+
+from core.stream_parser import IncrementalEventParser
+
+MODEL = "deepseek-chat"
+SYSTEM_PROMPT = "你是一个专业的日历助手，能精确识别多项活动并以JSON格式输出结果。请确保输出是有效的JSON对象，包含'events'数组。"
+
+
+def request_kwargs(prompt, max_tokens=2000, stream=False):
+    """chat.completions.create 的参数"""
+    return {
+        "model": MODEL,
+        "messages": [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt},
+        ],
+        "temperature": 0.7,  # 降低温度以获得更稳定的JSON输出
+        "max_tokens": max_tokens,  # 增加token限制以防JSON被截断
+        "stream": stream,
+        "response_format": {"type": "json_object"},
+    }
+
+
+def checked_json(content):
+    """确认返回内容是有效的 JSON，否则抛出 ValueError（可重试）"""
+    try:
+        json.loads(content)
+        return content
+    except (json.JSONDecodeError, TypeError):
+        raise ValueError("API返回了无效的JSON格式")
+
+
+def completion_content(response):
+    """非流式返回中的 JSON 文本"""
+    return checked_json(response.choices[0].message.content)
+
+
+def track_emitted(on_event):
+    """包装流式事件回调，返回 (回调, 已输出标记列表)
+
+    已有事件回调给调用方后再失败则不应重试，避免重复事件；标记跨多次尝试保留。
+    """
+    emitted = []
+
+    def emit(event):
+        emitted.append(True)
+        on_event(event)
+    return emit, emitted
+
+
+class StreamAccumulator:
+    """逐块消费流式返回：拼接全文，并把新完成的事件对象交给 on_event"""
+
+    def __init__(self, on_event):
+        self.on_event = on_event
+        self.parser = IncrementalEventParser()
+        self.chunks = []
+
+    def feed(self, chunk):
+        if not chunk.choices:
+            return
+        delta = chunk.choices[0].delta.content
+        if not delta:
+            return
+        self.chunks.append(delta)
+        for event in self.parser.feed(delta):
+            try:
+                self.on_event(event)
+            except Exception as e:
+                print(f"处理流式事件失败: {str(e)}")
+
+    def result(self):
+        return checked_json("".join(self.chunks))
@@ -1,73 +1,324 @@
 # event_manager.py
-import json
-import os
+import functools
+import threading
+from bisect import bisect_left, bisect_right, insort
 from datetime import datetime
+from core.storage import JsonFileStorage, JournalStorage, ShardedJsonStorage
+
+
+def _sort_key(event):
+    return event.sort_key
+
+
+def _date_key(year, month, day):
+    return year * 10000 + month * 100 + day
+
+
+def _synchronized(method):
+    """后台保存线程与界面线程共用 EventManager，读写内存结构和保存需互斥"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
 
 class EventManager:
-    def __init__(self, log_file="calendar_events.log"):
+    def __init__(self, log_file="calendar_events.log", journal=False, storage=None, lazy=False):
         self.log_file = log_file
+        if storage is not None:
+            self.storage = storage
+        elif lazy:
+            # 按月分片存储，首次使用时从原日志文件迁移
+            self.storage = ShardedJsonStorage(log_file + ".d", migrate_from=log_file)
+        elif journal:
+            self.storage = JournalStorage(log_file)
+        else:
+            self.storage = JsonFileStorage(log_file)
+        # 已加载到内存的事件（按日期时间有序）；按月分区的存储只包含已加载的月份
         self.events = []
+        # 已加载的年月 (YYYYMM)；None 表示全部事件都已加载
+        self._loaded_months = None
+        # 读取失败的年月：不算已加载，访问时重试，读取成功前不保存这些月份的修改
+        self._failed_months = set()
+        # 自上次保存以来的变更 [(操作, 事件)]，供日志式存储增量写入
+        self._changes = []
+        # 按日期 (YYYYMMDD) 索引的事件列表，以及按年月 (YYYYMM) 统计的每日事件数
+        self._day_index = {}
+        self._month_counts = {}
+        # 已有事件标识集合，用于 O(1) 重复检测
+        self._identities = set()
+        self._lock = threading.RLock()
+        # schedule_save 的延迟保存定时器
+        self._save_timer = None
         self.load_events_from_log()
 
+    @_synchronized
     def load_events_from_log(self):
+        if self.storage.partitioned:
+            # 按月分区的存储在访问某月时才加载该月事件
+            self.events = []
+            self._loaded_months = set()
+            self._failed_months = set()
+            self._changes = []
+            self._rebuild_index()
+            return
+
         try:
-            if os.path.exists(self.log_file):
-                with open(self.log_file, 'r', encoding='utf-8') as f:
-                    self.events = json.load(f)
-                print(f"从日志文件加载了 {len(self.events)} 个事件")
+            self.events = self.storage.load()
+            print(f"从日志文件加载了 {len(self.events)} 个事件")
         except Exception as e:
             print(f"加载日志文件失败: {str(e)}")
             self.events = []
+        self._changes = []
+        self._rebuild_index()
 
+    @_synchronized
     def save_events_to_log(self):
+        self._cancel_scheduled_save()
+        changes, blocked = self._changes, []
+        if self._failed_months:
+            # 分片读取失败的月份若此时保存，会用内存中仅有的新事件覆盖整个分片
+            for month_key in {event.month_key for _, event in changes} & self._failed_months:
+                self._ensure_month(*divmod(month_key, 100))
+            blocked = [c for c in changes if c[1].month_key in self._failed_months]
+            if blocked:
+                changes = [c for c in changes if c[1].month_key not in self._failed_months]
+                print(f"有 {len(blocked)} 项修改所在月份加载失败，暂不保存")
         try:
-            with open(self.log_file, 'w', encoding='utf-8') as f:
-                json.dump(self.events, f, ensure_ascii=False, indent=2)
+            self.storage.save(self.events, changes)
+            self._changes = blocked
             print(f"成功保存 {len(self.events)} 个事件到日志文件")
         except Exception as e:
             print(f"保存日志文件失败: {str(e)}")
 
+    def schedule_save(self, delay=1.0):
+        """延迟保存：delay 秒内的多次修改合并为一次，在后台线程中写入"""
+        with self._lock:
+            self._cancel_scheduled_save()
+            self._save_timer = threading.Timer(delay, self._scheduled_save)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+
+    def flush_pending_save(self):
+        """如有尚未执行的延迟保存，立即同步保存"""
+        with self._lock:
+            if self._save_timer is not None:
+                self.save_events_to_log()
+
+    def _scheduled_save(self):
+        with self._lock:
+            if self._save_timer is threading.current_thread():
+                self._save_timer = None
+                self.save_events_to_log()
+
+    def _cancel_scheduled_save(self):
+        if self._save_timer is not None:
+            self._save_timer.cancel()
+            self._save_timer = None
+
+    def _rebuild_index(self):
+        """根据 self.events 重建日期索引和月度统计"""
+        self._day_index = {}
+        self._month_counts = {}
+        self._identities = set()
+        # 日志文件可能来自旧版本，先保证有序并去除重复
+        self.events.sort(key=_sort_key)
+        unique_events = []
+        for event in self.events:
+            identity = event.identity
+            if identity in self._identities:
+                continue
+            self._identities.add(identity)
+            unique_events.append(event)
+            self._index_add(event)
+        self.events = unique_events
+
+    def _ensure_month(self, year, month):
+        """确保指定月份的事件已从分区存储加载到内存"""
+        month_key = year * 100 + month
+        if self._loaded_months is None or month_key in self._loaded_months:
+            return
+        try:
+            month_events = self.storage.load_month(year, month)
+        except Exception as e:
+            self._failed_months.add(month_key)
+            print(f"加载 {year}年{month}月 事件失败: {str(e)}")
+            return
+        self._failed_months.discard(month_key)
+        self._loaded_months.add(month_key)
+        self._insert_new(month_events)
+
+    @_synchronized
+    def set_view_window(self, year, month, prefetch=1):
+        """设置当前显示的月份
+
+        加载该月及前后 prefetch 个月，并释放窗口外且没有未保存修改的月份，
+        使常驻内存与历史总量无关。对一次性加载全部事件的存储不起作用。
+        """
+        if self._loaded_months is None:
+            return
+        center = year * 12 + month - 1
+        window = set()
+        for offset in range(-prefetch, prefetch + 1):
+            y, m = divmod(center + offset, 12)
+            window.add(y * 100 + m + 1)
+
+        for month_key in sorted(window):
+            self._ensure_month(*divmod(month_key, 100))
+
+        dirty = {event.month_key for _, event in self._changes}
+        for month_key in self._loaded_months - window - dirty:
+            self._evict_month(month_key)
+
+    def _evict_month(self, month_key):
+        """从内存中释放某个月份的事件（之后访问时重新加载）"""
+        self._loaded_months.discard(month_key)
+        for day in list(self._month_counts.get(month_key, {})):
+            for e in self._index_remove_day(month_key * 100 + day):
+                self._identities.discard(e.identity)
+        start = bisect_left(self.events, (month_key * 100,), key=_sort_key)
+        end = bisect_left(self.events, ((month_key + 1) * 100,), lo=start, key=_sort_key)
+        del self.events[start:end]
+
+    def _insert_new(self, events):
+        """把事件并入内存结构，跳过重复事件；返回实际新增的事件"""
+        new_events = []
+        for event in events:
+            identity = event.identity
+            if identity in self._identities:
+                continue
+            self._identities.add(identity)
+            new_events.append(event)
+
+        if new_events:
+            new_events.sort(key=_sort_key)
+            self.events = self._merge_sorted(self.events, new_events)
+            for event in new_events:
+                self._index_add(event)
+        return new_events
+
+    def _index_add(self, event):
+        date_key = event.date_key
+        insort(self._day_index.setdefault(date_key, []), event, key=_sort_key)
+        counts = self._month_counts.setdefault(date_key // 100, {})
+        counts[date_key % 100] = counts.get(date_key % 100, 0) + 1
+
+    def _index_remove_day(self, date_key):
+        removed = self._day_index.pop(date_key, [])
+        counts = self._month_counts.get(date_key // 100)
+        if counts is not None:
+            counts.pop(date_key % 100, None)
+            if not counts:
+                del self._month_counts[date_key // 100]
+        return removed
+
+    @_synchronized
     def add_event(self, event):
+        self._ensure_month(event.year, event.month)
+        identity = event.identity
         # 检查重复事件
-        if not any(
-            e["year"] == event["year"] and 
-            e["month"] == event["month"] and 
-            e["day"] == event["day"] and
-            e["time"] == event["time"] and
-            e["activity"] == event["activity"]
-            for e in self.events
-        ):
-            self.events.append(event)
-            self.events.sort(key=lambda x: (x["year"], x["month"], x["day"], x["time"]))
-            return True
-        return False
+        if identity in self._identities:
+            return False
+        self._identities.add(identity)
+        insort(self.events, event, key=_sort_key)
+        self._index_add(event)
+        self._changes.append(("add", event))
+        return True
+
+    @_synchronized
+    def add_events(self, events):
+        """批量添加事件，一次归并完成排序
 
+        返回 (新增数量, 重复数量)
+        """
+        events = list(events)
+        for month_key in {event.month_key for event in events}:
+            self._ensure_month(*divmod(month_key, 100))
+
+        new_events = self._insert_new(events)
+        self._changes.extend(("add", event) for event in new_events)
+        return len(new_events), len(events) - len(new_events)
+
+    @staticmethod
+    def _merge_sorted(existing, new_events):
+        """归并两个已排序的事件列表，键相同时已有事件在前"""
+        if not existing or new_events[0].sort_key >= existing[-1].sort_key:
+            return existing + new_events
+        merged = []
+        start = 0
+        for event in new_events:
+            end = bisect_right(existing, event.sort_key, lo=start, key=_sort_key)
+            merged.extend(existing[start:end])
+            merged.append(event)
+            start = end
+        merged.extend(existing[start:])
+        return merged
+
+    @_synchronized
     def delete_event(self, event):
-        self.events = [e for e in self.events if not (
-            e["year"] == event["year"] and 
-            e["month"] == event["month"] and 
-            e["day"] == event["day"] and
-            e["time"] == event["time"] and
-            e["activity"] == event["activity"] and
-            e["location"] == event["location"]
-        )]
+        def matches(e):
+            return e.identity == event.identity and e.location == event.location
+
+        self._ensure_month(event.year, event.month)
+        date_key = event.date_key
+        day_events = self._day_index.get(date_key)
+        if not day_events or not any(matches(e) for e in day_events):
+            return True
+
+        start, end = self._day_slice(date_key)
+        self.events[start:end] = [e for e in self.events[start:end] if not matches(e)]
+        remaining = []
+        for e in self._index_remove_day(date_key):
+            if matches(e):
+                self._identities.discard(e.identity)
+                self._changes.append(("delete", e))
+            else:
+                remaining.append(e)
+        for e in remaining:
+            self._index_add(e)
         return True
 
+    @_synchronized
     def delete_day_events(self, day, year, month):
-        initial_count = len(self.events)
-        self.events = [e for e in self.events if not (
-            e["year"] == year and e["month"] == month and e["day"] == day
-        )]
-        return initial_count != len(self.events)
+        self._ensure_month(year, month)
+        date_key = _date_key(year, month, day)
+        removed = self._index_remove_day(date_key)
+        if not removed:
+            return False
+        for e in removed:
+            self._identities.discard(e.identity)
+            self._changes.append(("delete", e))
+        start, end = self._day_slice(date_key)
+        del self.events[start:end]
+        return True
 
+    def _day_slice(self, date_key):
+        """返回某天事件在有序 self.events 中的区间"""
+        start = bisect_left(self.events, (date_key,), key=_sort_key)
+        end = bisect_left(self.events, (date_key + 1,), lo=start, key=_sort_key)
+        return start, end
+
+    @_synchronized
     def get_day_events(self, day, year, month):
-        return [
-            e for e in self.events
-            if e["year"] == year and e["month"] == month and e["day"] == day
-        ]
+        self._ensure_month(year, month)
+        return list(self._day_index.get(_date_key(year, month, day), ()))
 
+    @_synchronized
     def has_events_on_day(self, day, year, month):
-        return any(
-            e["year"] == year and e["month"] == month and e["day"] == day
-            for e in self.events
-        )
+        if self._loaded_months is not None and year * 100 + month not in self._loaded_months:
+            return day in self.get_month_summary(year, month)
+        return bool(self._day_index.get(_date_key(year, month, day)))
+
+    @_synchronized
+    def get_month_summary(self, year, month):
+        """返回指定月份 {日: 事件数} 的统计"""
+        month_key = year * 100 + month
+        if self._loaded_months is not None and month_key not in self._loaded_months:
+            # 未加载的月份在内存中没有未保存的修改，直接查询存储
+            try:
+                return self.storage.month_summary(year, month)
+            except Exception as e:
+                print(f"查询 {year}年{month}月 事件统计失败: {str(e)}")
+                return {}
+        return dict(self._month_counts.get(month_key, {}))
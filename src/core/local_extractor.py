@@ -0,0 +1,272 @@
+# local_extractor.py
+import json
+import re
+from datetime import date, timedelta
+
+# 与 APIClient._build_prompt 中的规则保持一致
+RELATIVE_DAYS = {"今天": 0, "今日": 0, "明天": 1, "明日": 1, "后天": 2, "大后天": 3}
+PERIOD_RANGES = {
+    "上午": "06:00-11:00",
+    "中午": "11:00-13:00",
+    "下午": "13:00-17:00",
+    "晚上": "17:00-24:00",
+    "凌晨": "24:00-06:00",
+}
+WEEKDAYS = {"一": 0, "二": 1, "三": 2, "四": 3, "五": 4, "六": 5, "日": 6, "天": 6}
+CN_DIGITS = {"零": 0, "〇": 0, "一": 1, "二": 2, "两": 2, "三": 3, "四": 4, "五": 5,
+             "六": 6, "七": 7, "八": 8, "九": 9, "十": 10}
+
+_NUM = r"[0-9零〇一二两三四五六七八九十]{1,3}"
+
+UNTIL_RE = re.compile(rf"即日起至({_NUM})月({_NUM})[日号]")
+WEEK_RANGE_RE = re.compile(r"(?:周|星期|礼拜)([一二三四五六日天])\s*[至到~-]\s*(?:周|星期|礼拜)?([一二三四五六日天])")
+FULL_DATE_RE = re.compile(r"(\d{4})[-/.年](\d{1,2})[-/.月](\d{1,2})[日号]?")
+MONTH_DAY_RE = re.compile(rf"({_NUM})月({_NUM})[日号]")
+RELATIVE_RE = re.compile("|".join(sorted(RELATIVE_DAYS, key=len, reverse=True)))
+WEEKDAY_RE = re.compile(r"(下下|下个?|这个?|本)?(?:周|星期|礼拜)([一二三四五六日天])")
+CLOCK_RE = re.compile(
+    rf"(上午|中午|下午|晚上|凌晨|早上|傍晚)?\s*(?:(\d{{1,2}})[:：](\d{{2}})|({_NUM})[点时](半|({_NUM})分?)?)"
+)
+PERIOD_RE = re.compile("|".join(PERIOD_RANGES))
+_PLACE_SUFFIX = r"(?:室|厅|楼|馆|房|中心|大厦|广场|酒店|公司|学校|医院|公园|会场|办公区|食堂)"
+LOCATION_PLACE_RE = re.compile(rf"(?:在|于|去|到)\s*([^\s,，。;；、]{{1,12}}{_PLACE_SUFFIX})")
+LOCATION_RE = re.compile(r"(?:在|于|地点[:：]?)\s*([^\s,，。;；、]+)")
+LOCATION_SUFFIX_RE = re.compile(rf"^[^\s]{{1,12}}{_PLACE_SUFFIX}$")
+SPLIT_RE = re.compile(r"然后|接着|之后|再去|[;；。\n]")
+NOISE_RE = re.compile(r"^[\s,，、:：的在于去到和与及]+|[\s,，、:：的]+$")
+UNPARSED_TIME_RE = re.compile(r"\d|[点时]|早上|傍晚|周末|月底|下个月|上旬|中旬|下旬")
+# 紧跟在钟点后的限定词（“8点前交报告”“3点左右”），说明时间是截止/大致时间
+TIME_QUALIFIER_RE = re.compile(r"^(?:之前|以前|前|之后|以后|后|左右|前后|以内|截止)")
+# 活动以“和/与/跟/同”开头，说明被切掉地点后只剩下参与人等片段
+COMPANION_RE = re.compile(r"^\s*(?:和|与|跟|同)")
+
+
+def _to_int(text):
+    """解析阿拉伯数字或中文数字（十、十五、二十五、零五、一二 等），无法解析时抛出 ValueError"""
+    if text.isdigit():
+        return int(text)
+    if not text or any(ch not in CN_DIGITS for ch in text):
+        raise ValueError(f"无法解析的数字: {text}")
+    if "十" in text:
+        tens, _, ones = text.partition("十")
+        if len(tens) > 1 or len(ones) > 1 or "十" in ones:
+            raise ValueError(f"无法解析的数字: {text}")
+        return (CN_DIGITS[tens] if tens else 1) * 10 + (CN_DIGITS[ones] if ones else 0)
+    # 逐位读法：零五 → 5，一二 → 12
+    value = 0
+    for ch in text:
+        value = value * 10 + CN_DIGITS[ch]
+    return value
+
+
+class LocalEventExtractor:
+    """离线规则抽取器
+
+    用预编译的正则实现提示词中的模糊时间规则（今天/明天/后天、上午/下午等时段、
+    周x至周y、即日起至n月m日），在本地直接处理常见的简单输入。
+    extract() 返回 (事件列表, 置信度)；置信度不足时调用方应回退到 API。
+    """
+
+    def __init__(self, today=None):
+        self._today = today
+
+    def today(self):
+        return self._today or date.today()
+
+    def extract(self, text):
+        text = text.strip()
+        if not text:
+            return [], 0.0
+        try:
+            return self._extract(text)
+        except (ValueError, KeyError, OverflowError) as e:
+            # 规则无法处理的写法交给 API，不能让异常传到调用方（界面线程）
+            print(f"本地解析失败，改用 API: {str(e)}")
+            return [], 0.0
+
+    def _extract(self, text):
+        today = self.today()
+        events = []
+        confidence = 1.0
+        current_dates = None
+        previous_hour = None
+
+        for segment in SPLIT_RE.split(text):
+            segment = segment.strip()
+            if not segment:
+                continue
+            dates, segment, date_found = self._extract_dates(segment, today)
+            if date_found:
+                current_dates = dates
+            elif current_dates is None:
+                # 没有任何日期信息时交给模型判断
+                return [], 0.0
+
+            event_time, hour, segment, time_confidence = self._extract_time(segment, previous_hour)
+            confidence = min(confidence, time_confidence)
+            if hour is not None:
+                previous_hour = hour
+            location, segment = self._extract_location(segment)
+            if COMPANION_RE.match(segment):
+                confidence = min(confidence, 0.6)
+            activity = NOISE_RE.sub("", segment).strip()
+            activity = re.sub(r"\s+", " ", activity)
+
+            if not activity:
+                return [], 0.0
+            if " " in activity:
+                # 时间或地点从活动中间被切掉，剩下的是拼接出的片段
+                confidence = min(confidence, 0.6)
+            if UNPARSED_TIME_RE.search(activity):
+                # 剩余文本中还有未能识别的时间表达
+                confidence = min(confidence, 0.5)
+            if event_time == "未指定":
+                confidence = min(confidence, 0.7)
+            if location == "未指定":
+                confidence = min(confidence, 0.9)
+
+            for day in current_dates:
+                events.append({
+                    "日期": day.strftime("%Y-%m-%d"),
+                    "地点": location,
+                    "时间": event_time,
+                    "事项": activity,
+                })
+
+        if not events:
+            return [], 0.0
+        return events, confidence
+
+    def extract_json(self, text):
+        """与 API 返回格式相同的 JSON 文本及置信度"""
+        events, confidence = self.extract(text)
+        return json.dumps({"events": events}, ensure_ascii=False), confidence
+
+    def _extract_dates(self, segment, today):
+        match = UNTIL_RE.search(segment)
+        if match:
+            end = self._resolve_month_day(_to_int(match.group(1)), _to_int(match.group(2)), today)
+            if end is None or end < today:
+                return [], segment, False
+            days = [today + timedelta(days=n) for n in range((end - today).days + 1)]
+            return days, self._cut(segment, match), True
+
+        match = WEEK_RANGE_RE.search(segment)
+        if match:
+            first, last = WEEKDAYS[match.group(1)], WEEKDAYS[match.group(2)]
+            if first > last:
+                return [], segment, False
+            monday = today - timedelta(days=today.weekday())
+            if today.weekday() > last:
+                monday += timedelta(days=7)
+            days = [monday + timedelta(days=n) for n in range(first, last + 1)]
+            return days, self._cut(segment, match), True
+
+        match = FULL_DATE_RE.search(segment)
+        if match:
+            try:
+                day = date(int(match.group(1)), int(match.group(2)), int(match.group(3)))
+            except ValueError:
+                return [], segment, False
+            return [day], self._cut(segment, match), True
+
+        match = MONTH_DAY_RE.search(segment)
+        if match:
+            day = self._resolve_month_day(_to_int(match.group(1)), _to_int(match.group(2)), today)
+            if day is None:
+                return [], segment, False
+            return [day], self._cut(segment, match), True
+
+        match = RELATIVE_RE.search(segment)
+        if match:
+            day = today + timedelta(days=RELATIVE_DAYS[match.group(0)])
+            return [day], self._cut(segment, match), True
+
+        match = WEEKDAY_RE.search(segment)
+        if match:
+            prefix, weekday = match.group(1) or "", WEEKDAYS[match.group(2)]
+            monday = today - timedelta(days=today.weekday())
+            if prefix.startswith("下下"):
+                monday += timedelta(days=14)
+            elif prefix.startswith("下"):
+                monday += timedelta(days=7)
+            elif not prefix and weekday < today.weekday():
+                # 单说“周x”且本周已过，指下周
+                monday += timedelta(days=7)
+            return [monday + timedelta(days=weekday)], self._cut(segment, match), True
+
+        return [], segment, False
+
+    @staticmethod
+    def _resolve_month_day(month, day, today):
+        """不带年份的 n月m日：今年已过去超过一个月的日期视为明年"""
+        for year in (today.year, today.year + 1):
+            try:
+                candidate = date(year, month, day)
+            except ValueError:
+                return None
+            if candidate >= today - timedelta(days=31):
+                return candidate
+        return None
+
+    def _extract_time(self, segment, previous_hour=None):
+        """返回 (时间文本, 具体钟点或 None, 剩余文本, 置信度)"""
+        match = CLOCK_RE.search(segment)
+        if match:
+            period = match.group(1)
+            confidence = 1.0
+            if TIME_QUALIFIER_RE.match(segment[match.end():].lstrip()):
+                confidence = 0.5
+            if match.group(2):
+                hour, minute = int(match.group(2)), int(match.group(3))
+            else:
+                hour = _to_int(match.group(4))
+                if match.group(5) == "半":
+                    minute = 30
+                elif match.group(6):
+                    minute = _to_int(match.group(6))
+                else:
+                    minute = 0
+            if period in ("下午", "晚上", "傍晚") and hour < 12:
+                hour += 12
+            elif period == "晚上" and hour == 12:
+                # 按提示词规则 晚上=17:00-24:00，“晚上12点”是当天的 24:00
+                hour = 24
+            elif period == "凌晨" and hour == 12:
+                hour = 0
+            elif period == "中午" and hour < 11:
+                hour += 12
+            elif period is None and previous_hour is not None and 12 <= previous_hour < 24 and hour < 12:
+                # “下午3点开会，然后5点……”：后续事件沿用前一事件的下午/晚上
+                hour += 12
+            elif period is None and 1 <= hour <= 7 and not (match.group(2) or "").startswith("0"):
+                # “两点”“3点”未说明上午/下午，凌晨还是下午交给模型判断
+                confidence = min(confidence, 0.6)
+            if hour > 24 or minute > 59:
+                return "未指定", None, segment, 1.0
+            if hour == 24 and minute:
+                # 24 点之后实为次日凌晨，日期交给模型判断
+                hour = 0
+                confidence = min(confidence, 0.5)
+            return f"{hour:02d}:{minute:02d}", hour, self._cut(segment, match), confidence
+
+        match = PERIOD_RE.search(segment)
+        if match:
+            return PERIOD_RANGES[match.group(0)], None, self._cut(segment, match), 1.0
+        return "未指定", None, segment, 1.0
+
+    def _extract_location(self, segment):
+        match = LOCATION_PLACE_RE.search(segment) or LOCATION_RE.search(segment)
+        if match:
+            return match.group(1), self._cut(segment, match)
+
+        tokens = segment.split()
+        for token in tokens:
+            if LOCATION_SUFFIX_RE.match(token):
+                tokens.remove(token)
+                return token, " ".join(tokens)
+        return "未指定", segment
+
+    @staticmethod
+    def _cut(segment, match):
+        return (segment[:match.start()] + " " + segment[match.end():]).strip()
@@ -0,0 +1,130 @@
+# models.py
+import json
+import sys
+
+
+class Event:
+    """紧凑的事件对象
+
+    日期打包为整数 date_key (YYYYMMDD)，时间、地点、事项字符串经过 intern 共享，
+    取代原先每个事件一个七键 dict 的表示。通过 from_dict()/to_dict() 与日志文件中的
+    JSON 格式无损互转。
+    """
+
+    __slots__ = ("date_key", "time", "location", "activity", "_raw_date")
+
+    def __init__(self, year, month, day, time, location, activity, date=None):
+        self.date_key = year * 10000 + month * 100 + day
+        self.time = sys.intern(str(time))
+        self.location = sys.intern(str(location))
+        self.activity = sys.intern(str(activity))
+        # 仅当原始日期字符串不是规范格式时才保留，保证转换无损
+        self._raw_date = date if date and date != self._format_date(year, month, day) else None
+
+    @staticmethod
+    def _format_date(year, month, day):
+        return f"{year:04d}-{month:02d}-{day:02d}"
+
+    @property
+    def year(self):
+        return self.date_key // 10000
+
+    @property
+    def month(self):
+        return self.date_key // 100 % 100
+
+    @property
+    def day(self):
+        return self.date_key % 100
+
+    @property
+    def month_key(self):
+        """打包的年月 (YYYYMM)"""
+        return self.date_key // 100
+
+    @property
+    def date(self):
+        return self._raw_date or self._format_date(self.year, self.month, self.day)
+
+    @property
+    def sort_key(self):
+        return (self.date_key, self.time)
+
+    @property
+    def identity(self):
+        """重复判定所用的标识：同一天、同一时间、同一事项"""
+        return (self.date_key, self.time, self.activity)
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            data["year"], data["month"], data["day"],
+            data["time"], data["location"], data["activity"],
+            date=data.get("date"),
+        )
+
+    @classmethod
+    def from_api(cls, data):
+        """由模型返回的单个事件对象（中文或英文字段）构建事件；日期无效时返回 None"""
+        try:
+            date_str = data.get("date") or data.get("日期")
+            if not date_str:
+                return None
+
+            date_parts = date_str.split("-")
+            if len(date_parts) != 3:
+                return None
+
+            year, month, day = map(int, date_parts)
+            return cls(
+                year, month, day,
+                time=data.get("time", data.get("时间", "未指定")),
+                location=data.get("location", data.get("地点", "未指定")),
+                activity=data.get("activity", data.get("事项", "未指定")),
+                date=date_str
+            )
+        except (ValueError, AttributeError, KeyError):
+            return None
+
+    @classmethod
+    def from_api_response(cls, api_response):
+        """由 API 返回的 JSON（文本或已解析对象）构建事件列表，跳过无效事件"""
+        if isinstance(api_response, str):
+            api_response = json.loads(api_response)
+
+        events_data = api_response
+        if isinstance(api_response, dict):
+            if 'events' in api_response:
+                events_data = api_response['events']
+            else:
+                events_data = [api_response]
+
+        events = []
+        for data in events_data:
+            event = cls.from_api(data)
+            if event is not None:
+                events.append(event)
+        return events
+
+    def to_dict(self):
+        return {
+            "date": self.date,
+            "year": self.year,
+            "month": self.month,
+            "day": self.day,
+            "location": self.location,
+            "time": self.time,
+            "activity": self.activity,
+        }
+
+    def __eq__(self, other):
+        if not isinstance(other, Event):
+            return NotImplemented
+        return (self.identity == other.identity and
+                self.location == other.location and
+                self.date == other.date)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"Event({self.date} {self.time} {self.activity!r} @ {self.location!r})"
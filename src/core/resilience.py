@@ -0,0 +1,218 @@
+# resilience.py
+import asyncio
+import random
+import threading
+import time
+
+
+class CircuitOpenError(Exception):
+    """熔断器处于打开状态，请求被直接拒绝"""
+
+
+class RetryPolicy:
+    """带随机抖动的指数退避（full jitter），优先遵循服务端的 Retry-After"""
+
+    def __init__(self, max_attempts=4, base_delay=0.5, max_delay=20.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt, retry_after=None):
+        """第 attempt 次（从 1 开始）失败后应等待的秒数"""
+        if retry_after is not None:
+            return min(max(retry_after, 0.0), self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+
+
+class TokenBucket:
+    """客户端限流：每秒补充 rate 个令牌，最多积攒 capacity 个"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1, int(rate))
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self):
+        with self._lock:
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+    def acquire(self, timeout=None):
+        """阻塞直到取得令牌；超时返回 False"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        """acquire() 的协程版本，等待期间不阻塞事件循环"""
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            await asyncio.sleep(wait)
+
+
+class CircuitBreaker:
+    """熔断器
+
+    连续失败 failure_threshold 次后打开，reset_timeout 秒内拒绝所有请求；
+    之后进入半开状态放行一个探测请求，成功则关闭，失败则重新打开。
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def is_open(self):
+        """当前是否应短路（不消耗半开状态的探测机会）"""
+        with self._lock:
+            if self.state == self.OPEN:
+                return time.monotonic() - self._opened_at < self.reset_timeout
+            return self.state == self.HALF_OPEN and self._probe_in_flight
+
+    def allow_request(self):
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probe_in_flight = False
+
+    def abandon(self):
+        """请求被取消、没有结果时释放半开状态的探测机会"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+            self._probe_in_flight = False
+
+
+def _before_attempt(breaker):
+    if breaker is not None and not breaker.allow_request():
+        raise CircuitOpenError("API 服务暂时不可用，已暂停请求")
+
+
+def _after_failure(error, attempt, retry_policy, breaker, is_retryable, retry_after_of, is_failure):
+    """记录一次失败；需要重试时返回等待秒数，否则返回 None
+
+    is_failure 判断错误是否说明上游不健康（计入熔断），is_retryable 判断是否重试，
+    两者不同时如流式请求已输出部分事件后断开：不重试，但仍计入熔断。
+    """
+    if breaker is not None:
+        if (is_failure or is_retryable)(error):
+            breaker.record_failure()
+        else:
+            # 如 401/400 等客户端错误，不代表服务端不健康
+            breaker.record_success()
+    if not is_retryable(error) or attempt >= retry_policy.max_attempts:
+        return None
+    return retry_policy.delay(attempt, retry_after_of(error))
+
+
+def call_with_resilience(func, retry_policy, rate_limiter=None, breaker=None,
+                         is_retryable=lambda e: True, retry_after_of=lambda e: None,
+                         sleep=time.sleep, is_failure=None):
+    """按重试策略调用 func()；每次尝试前经过限流和熔断检查
+
+    is_failure 默认与 is_retryable 相同。
+    """
+    attempt = 0
+    while True:
+        attempt += 1
+        _before_attempt(breaker)
+        if rate_limiter is not None:
+            rate_limiter.acquire()
+
+        try:
+            result = func()
+        except Exception as e:
+            delay = _after_failure(e, attempt, retry_policy, breaker, is_retryable, retry_after_of,
+                                   is_failure)
+            if delay is None:
+                raise
+            sleep(delay)
+            continue
+
+        if breaker is not None:
+            breaker.record_success()
+        return result
+
+
+async def call_with_resilience_async(func, retry_policy, rate_limiter=None, breaker=None,
+                                     is_retryable=lambda e: True, retry_after_of=lambda e: None,
+                                     is_failure=None):
+    """call_with_resilience 的协程版本，func() 返回可等待对象"""
+    attempt = 0
+    while True:
+        attempt += 1
+        _before_attempt(breaker)
+        if rate_limiter is not None:
+            await rate_limiter.acquire_async()
+
+        try:
+            result = await func()
+        except asyncio.CancelledError:
+            if breaker is not None:
+                breaker.abandon()
+            raise
+        except Exception as e:
+            delay = _after_failure(e, attempt, retry_policy, breaker, is_retryable, retry_after_of,
+                                   is_failure)
+            if delay is None:
+                raise
+            await asyncio.sleep(delay)
+            continue
+
+        if breaker is not None:
+            breaker.record_success()
+        return result
@@ -0,0 +1,392 @@
+# storage.py
+import json
+import os
+import re
+import sqlite3
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+
+from core.models import Event
+from utils.file_io import atomic_write_json, read_json_lines, truncate_partial_line
+
+
+def _sort_key(event):
+    return event.sort_key
+
+
+class EventStorage(ABC):
+    """EventManager 的存储后端接口
+
+    事件以 core.models.Event 对象进出存储，文件中仍保存为原有的 JSON 字典格式。
+
+    - load(): 返回全部事件（partitioned 为 False 的后端）
+    - load_month(year, month) / month_summary(year, month): 按月读取（partitioned 为 True 的后端）
+    - save(events, changes): 持久化；changes 为自上次保存以来的 [('add'|'delete', 事件)]
+    """
+
+    # 为 True 时 EventManager 不在启动时加载全部事件，而是按月向后端查询
+    partitioned = False
+
+    @abstractmethod
+    def load(self):
+        pass
+
+    def load_month(self, year, month):
+        month_key = year * 100 + month
+        return [e for e in self.load() if e.month_key == month_key]
+
+    def month_summary(self, year, month):
+        summary = {}
+        for event in self.load_month(year, month):
+            summary[event.day] = summary.get(event.day, 0) + 1
+        return summary
+
+    @abstractmethod
+    def save(self, events, changes):
+        pass
+
+    def close(self):
+        pass
+
+
+class JsonFileStorage(EventStorage):
+    """默认存储：整个事件列表保存为一个 JSON 文件，每次保存全量重写"""
+
+    def __init__(self, log_file):
+        self.log_file = log_file
+
+    def load(self):
+        if not os.path.exists(self.log_file):
+            return []
+        with open(self.log_file, 'r', encoding='utf-8') as f:
+            return [Event.from_dict(data) for data in json.load(f)]
+
+    def save(self, events, changes):
+        atomic_write_json(self.log_file, [e.to_dict() for e in events], indent=2)
+
+
+class JournalStorage(EventStorage):
+    """日志式存储：快照文件 + 追加写入的变更日志(JSON Lines)
+
+    每次保存只追加本次的 add/delete 记录，加载时在快照上重放日志；
+    日志记录数超过 compact_threshold 后将当前事件写成新快照（原子替换）并清空日志。
+    快照与 JsonFileStorage 的文件格式相同。
+    """
+
+    def __init__(self, log_file, journal_file=None, compact_threshold=1000):
+        self.log_file = log_file
+        self.journal_file = journal_file or log_file + ".journal"
+        self.compact_threshold = compact_threshold
+        self.journal_records = 0
+
+    def load(self):
+        # 写入中断留下的残行不会被重放，但必须截掉，否则下次追加的记录会接在它后面
+        torn = truncate_partial_line(self.journal_file)
+        if torn:
+            print(f"已截去日志末尾不完整的记录 ({torn} 字节)")
+        return self.read_events()
+
+    def read_events(self):
+        """只读地加载快照并重放日志，不修改文件（用于迁移）"""
+        events = {}
+        if os.path.exists(self.log_file):
+            with open(self.log_file, 'r', encoding='utf-8') as f:
+                for data in json.load(f):
+                    event = Event.from_dict(data)
+                    events.setdefault(event.identity, event)
+
+        self.journal_records = 0
+        for record in read_json_lines(self.journal_file):
+            self.journal_records += 1
+            if not record.get("event"):
+                continue
+            event = Event.from_dict(record["event"])
+            identity = event.identity
+            if record.get("op") == "add":
+                events.setdefault(identity, event)
+            elif record.get("op") == "delete":
+                existing = events.get(identity)
+                if existing and existing.location == event.location:
+                    del events[identity]
+        return list(events.values())
+
+    def save(self, events, changes):
+        if changes:
+            truncate_partial_line(self.journal_file)
+            with open(self.journal_file, 'a', encoding='utf-8') as f:
+                for op, event in changes:
+                    f.write(json.dumps({"op": op, "event": event.to_dict()},
+                                       ensure_ascii=False, separators=(',', ':')))
+                    f.write("\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self.journal_records += len(changes)
+
+        if self.journal_records >= self.compact_threshold:
+            self.compact(events)
+
+    def compact(self, events):
+        """把当前事件写成新快照并清空日志
+
+        先替换快照再截断日志；若在两步之间崩溃，重放日志仍是幂等的。
+        """
+        atomic_write_json(self.log_file, [e.to_dict() for e in events], separators=(',', ':'))
+        with open(self.journal_file, 'w', encoding='utf-8'):
+            pass
+        self.journal_records = 0
+
+
+class SQLiteStorage(EventStorage):
+    """SQLite 存储（WAL 模式）
+
+    事件按月从带索引的表中查询，启动时无需读取全部历史。
+    (year, month, day, time, activity) 上的唯一索引既用于重复判定，
+    其前缀也服务于按日期的查询和统计。
+    """
+
+    partitioned = True
+
+    _INSERT_SQL = (
+        "INSERT OR IGNORE INTO events (date, year, month, day, time, location, activity) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)"
+    )
+
+    # PRAGMA user_version 的取值：已完成从 JSON 日志的迁移（或无需迁移）
+    _MIGRATED = 1
+
+    def __init__(self, db_file="calendar_events.db", migrate_from=None):
+        self.db_file = db_file
+        self.conn = sqlite3.connect(db_file, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS events (
+                id INTEGER PRIMARY KEY,
+                date TEXT,
+                year INTEGER NOT NULL,
+                month INTEGER NOT NULL,
+                day INTEGER NOT NULL,
+                time TEXT NOT NULL,
+                location TEXT,
+                activity TEXT NOT NULL
+            )
+        """)
+        self.conn.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_events_identity
+            ON events (year, month, day, time, activity)
+        """)
+        self.conn.commit()
+
+        if self.conn.execute("PRAGMA user_version").fetchone()[0] < self._MIGRATED:
+            self._migrate(migrate_from)
+
+    def _migrate(self, migrate_from):
+        """从 JSON 日志迁移；失败时不标记完成，下次启动重试，原日志文件保持不变"""
+        # 旧版本创建的数据库没有迁移标记，已有事件说明迁移已完成
+        has_events = self.conn.execute("SELECT 1 FROM events LIMIT 1").fetchone() is not None
+        if not has_events and migrate_from and os.path.exists(migrate_from):
+            try:
+                count = migrate_json_to_sqlite(migrate_from, self)
+            except Exception as e:
+                print(f"从 {migrate_from} 迁移事件失败，下次启动时重试: {str(e)}")
+                return
+            print(f"已从 {migrate_from} 迁移 {count} 个事件到 {self.db_file}")
+        self.conn.execute(f"PRAGMA user_version = {self._MIGRATED}")
+
+    @staticmethod
+    def _row_to_event(row):
+        return Event(row["year"], row["month"], row["day"],
+                     row["time"], row["location"], row["activity"], date=row["date"])
+
+    @staticmethod
+    def _event_params(event):
+        return (event.date, event.year, event.month, event.day,
+                event.time, event.location, event.activity)
+
+    def load(self):
+        rows = self.conn.execute(
+            "SELECT * FROM events ORDER BY year, month, day, time"
+        )
+        return [self._row_to_event(row) for row in rows]
+
+    def load_month(self, year, month):
+        rows = self.conn.execute(
+            "SELECT * FROM events WHERE year = ? AND month = ? ORDER BY day, time",
+            (year, month)
+        )
+        return [self._row_to_event(row) for row in rows]
+
+    def month_summary(self, year, month):
+        rows = self.conn.execute(
+            "SELECT day, COUNT(*) FROM events WHERE year = ? AND month = ? GROUP BY day",
+            (year, month)
+        )
+        return {day: count for day, count in rows}
+
+    def insert_many(self, events):
+        """批量插入（重复事件被唯一索引忽略），返回实际插入的数量"""
+        with self.conn:
+            before = self.conn.total_changes
+            self.conn.executemany(
+                self._INSERT_SQL,
+                (self._event_params(event) for event in events)
+            )
+            return self.conn.total_changes - before
+
+    def save(self, events, changes):
+        with self.conn:
+            for op, event in changes:
+                if op == "add":
+                    self.conn.execute(self._INSERT_SQL, self._event_params(event))
+                elif op == "delete":
+                    self.conn.execute(
+                        "DELETE FROM events WHERE year = ? AND month = ? AND day = ? "
+                        "AND time = ? AND activity = ? AND location IS ?",
+                        (event.year, event.month, event.day,
+                         event.time, event.activity, event.location)
+                    )
+
+    def close(self):
+        self.conn.close()
+
+
+class ShardedJsonStorage(EventStorage):
+    """按月分片的 JSON 存储
+
+    每个月的事件保存在 <目录>/YYYY-MM.json，目录下的 index.json 记录各月份每天的事件数，
+    因此查询月度统计不需要读取分片，启动时也不需要读取任何事件。
+    保存时只重写有变更的月份分片。
+
+    index.json 同时表示迁移已完成：从原日志迁移失败时不写入 index.json（原日志不修改），
+    本次运行中的修改只写入分片，下次启动时重新迁移并与这些分片合并。
+    index.json 损坏时按分片文件重建索引。
+    """
+
+    partitioned = True
+
+    _SHARD_RE = re.compile(r"^(\d{4}-\d{2})\.json$")
+
+    def __init__(self, directory, migrate_from=None):
+        self.directory = directory
+        self.index_file = os.path.join(directory, "index.json")
+        os.makedirs(directory, exist_ok=True)
+        # {"YYYY-MM": {"日": 事件数}}
+        self.index = {}
+        self.migrated = True
+        if os.path.exists(self.index_file):
+            try:
+                with open(self.index_file, 'r', encoding='utf-8') as f:
+                    self.index = json.load(f)
+            except Exception as e:
+                print(f"加载分片索引失败，按分片文件重建: {str(e)}")
+                self.index = self._scan_shards()
+            return
+
+        self.index = self._scan_shards()
+        if migrate_from and os.path.exists(migrate_from):
+            try:
+                count = self.import_events(JournalStorage(migrate_from).read_events())
+                print(f"已从 {migrate_from} 迁移 {count} 个事件到 {directory}")
+            except Exception as e:
+                self.migrated = False
+                self.index = self._scan_shards()
+                print(f"从 {migrate_from} 迁移事件失败，下次启动时重试: {str(e)}")
+
+    def _scan_shards(self):
+        """按目录中的分片文件重建索引；无法读取的分片记为空统计，访问该月时再报错"""
+        index = {}
+        for name in sorted(os.listdir(self.directory)):
+            match = self._SHARD_RE.match(name)
+            if not match:
+                continue
+            counts = {}
+            try:
+                with open(os.path.join(self.directory, name), 'r', encoding='utf-8') as f:
+                    for data in json.load(f):
+                        day = str(Event.from_dict(data).day)
+                        counts[day] = counts.get(day, 0) + 1
+            except Exception as e:
+                print(f"读取分片 {name} 失败: {str(e)}")
+            index[match.group(1)] = counts
+        return index
+
+    @staticmethod
+    def _month_key(year, month):
+        return f"{year:04d}-{month:02d}"
+
+    def _shard_path(self, month_key):
+        return os.path.join(self.directory, month_key + ".json")
+
+    def load(self):
+        events = []
+        for month_key in sorted(self.index):
+            year, month = map(int, month_key.split("-"))
+            events.extend(self.load_month(year, month))
+        return events
+
+    def load_month(self, year, month):
+        month_key = self._month_key(year, month)
+        if month_key not in self.index:
+            return []
+        with open(self._shard_path(month_key), 'r', encoding='utf-8') as f:
+            return [Event.from_dict(data) for data in json.load(f)]
+
+    def month_summary(self, year, month):
+        counts = self.index.get(self._month_key(year, month), {})
+        return {int(day): count for day, count in counts.items()}
+
+    def _write_month(self, month_key, month_events):
+        if month_events:
+            atomic_write_json(self._shard_path(month_key),
+                              [e.to_dict() for e in month_events], indent=2)
+            counts = {}
+            for event in month_events:
+                counts[str(event.day)] = counts.get(str(event.day), 0) + 1
+            self.index[month_key] = counts
+        else:
+            self.index.pop(month_key, None)
+            try:
+                os.remove(self._shard_path(month_key))
+            except FileNotFoundError:
+                pass
+
+    def import_events(self, events):
+        """把全部事件按月并入分片（用于迁移），返回导入数量
+
+        先读取全部涉及的已有分片，任一分片无法读取时在写入前抛出异常。
+        """
+        by_month = {}
+        count = 0
+        for event in events:
+            month_events = by_month.setdefault(self._month_key(event.year, event.month), {})
+            if event.identity not in month_events:
+                month_events[event.identity] = event
+                count += 1
+        existing = {}
+        for month_key in by_month:
+            year, month = map(int, month_key.split("-"))
+            existing[month_key] = self.load_month(year, month)
+        for month_key, month_events in by_month.items():
+            for event in existing[month_key]:
+                month_events.setdefault(event.identity, event)
+            self._write_month(month_key, sorted(month_events.values(), key=_sort_key))
+        atomic_write_json(self.index_file, self.index)
+        return count
+
+    def save(self, events, changes):
+        if not changes:
+            return
+        # 有变更的月份在 EventManager 中必然已加载，events 按日期有序，可直接切出该月
+        for month_key in {event.month_key for _, event in changes}:
+            start = bisect_left(events, (month_key * 100,), key=_sort_key)
+            end = bisect_left(events, ((month_key + 1) * 100,), lo=start, key=_sort_key)
+            self._write_month(self._month_key(*divmod(month_key, 100)), events[start:end])
+        if self.migrated:
+            atomic_write_json(self.index_file, self.index)
+
+
+def migrate_json_to_sqlite(log_file, sqlite_storage):
+    """一次性把 JSON 日志（含未压缩的 journal）导入 SQLite，返回导入数量"""
+    events = JournalStorage(log_file).read_events()
+    return sqlite_storage.insert_many(events)
@@ -0,0 +1,84 @@
+# stream_parser.py
+import json
+
+
+class IncrementalEventParser:
+    """从流式返回的 JSON 文本中增量提取事件对象
+
+    逐块 feed() 模型输出，每当顶层对象的 "events" 数组（或顶层数组本身）中
+    有一个元素对象完整结束，就立即解析并返回它，而不必等待整个 JSON 结束。
+    只扫描新到达的字符，已处理且不再需要的文本会被丢弃。
+    """
+
+    def __init__(self, array_key="events"):
+        self.array_key = array_key
+        self._text = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = None
+        self._last_key = None
+        # 目标数组内部的嵌套深度；None 表示当前不在目标数组中
+        self._array_depth = None
+        self._array_done = False
+        self._object_start = None
+
+    def feed(self, chunk):
+        """输入一段文本，返回其中新完成的事件对象列表"""
+        self._text += chunk
+        text = self._text
+        events = []
+        i = self._pos
+        while i < len(text):
+            ch = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._last_key = text[self._string_start + 1:i]
+            elif ch == '"':
+                self._in_string = True
+                self._string_start = i
+            elif ch in '{[':
+                self._depth += 1
+                if ch == '[' and self._array_depth is None and not self._array_done and (
+                    self._depth == 1 or (self._depth == 2 and self._last_key == self.array_key)
+                ):
+                    self._array_depth = self._depth
+                elif ch == '{' and self._array_depth is not None and self._depth == self._array_depth + 1:
+                    self._object_start = i
+            elif ch in '}]':
+                if ch == '}' and self._object_start is not None and self._depth == self._array_depth + 1:
+                    try:
+                        events.append(json.loads(text[self._object_start:i + 1]))
+                    except json.JSONDecodeError:
+                        pass
+                    self._object_start = None
+                elif ch == ']' and self._depth == self._array_depth:
+                    self._array_depth = None
+                    self._array_done = True
+                self._depth -= 1
+            i += 1
+
+        self._pos = i
+        self._discard_consumed()
+        return events
+
+    def _discard_consumed(self):
+        keep = self._pos
+        if self._object_start is not None:
+            keep = min(keep, self._object_start)
+        if self._in_string:
+            keep = min(keep, self._string_start)
+        if keep:
+            self._text = self._text[keep:]
+            self._pos -= keep
+            if self._object_start is not None:
+                self._object_start -= keep
+            if self._string_start is not None:
+                self._string_start -= keep
@@ -1,23 +1,114 @@
 # main.py
+import time
+
+_START = time.perf_counter()
+
+import argparse
+import sys
+import threading
 import tkinter as tk
 from tkinter import ttk, messagebox
 from core.event_manager import EventManager
-from core.api_client import APIClient
 from ui.main_window import CalendarUI
-from services.text_watcher import TextSelectionWatcher
-from services.tray_icon import TrayIcon
+
+
+class StartupProfiler:
+    """记录启动各阶段耗时，--profile-startup 时在启动完成后输出"""
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.steps = [("导入界面模块", time.perf_counter() - _START, threading.current_thread().name)]
+        self._last = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def mark(self, step):
+        with self._lock:
+            now = time.perf_counter()
+            self.steps.append((step, now - self._last, threading.current_thread().name))
+            self._last = now
+
+    def report(self):
+        if not self.enabled:
+            return
+        print("启动耗时：")
+        for step, elapsed, thread in self.steps:
+            print(f"  {elapsed * 1000:8.1f} ms  {step} [{thread}]")
+        print(f"  {(time.perf_counter() - _START) * 1000:8.1f} ms  合计")
+
 
 class CalendarApp:
-    def __init__(self, root):
+    def __init__(self, root, speculative=False, speculative_budget=10, profiler=None):
         self.root = root
-        self.event_manager = EventManager()
-        self.api_handler = APIClient()
-        self.ui = CalendarUI(root, self.event_manager, self.api_handler)
-        self.selection_watcher = TextSelectionWatcher(self.ui)
-        self.tray_icon = TrayIcon(self)
+        self.speculative = speculative
+        self.speculative_budget = speculative_budget
+        self.profiler = profiler or StartupProfiler()
+        self.event_manager = EventManager(lazy=True)
+        self.profiler.mark("加载事件索引")
+        # API 客户端、选区监听和托盘在窗口显示后再导入和初始化
+        self.api_handler = None
+        self.selection_watcher = None
+        self.tray_icon = None
+        self.ui = CalendarUI(root, self.event_manager)
+        self.profiler.mark("构建主窗口")
         self.minimized_to_tray = False
         
         self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        # after_idle 中再排一个 after，保证首次绘制完成后才开始加载其余部分
+        self.root.after_idle(lambda: self.root.after(0, self._start_deferred))
+
+    def _start_deferred(self):
+        self.profiler.mark("首次绘制")
+        threading.Thread(target=self._load_in_background, daemon=True).start()
+
+    def _load_in_background(self):
+        """导入 openai 等较重的依赖并创建 API 客户端和托盘，完成后交给主线程
+
+        托盘失败不影响 API 客户端；客户端失败时允许用户点击“更新密钥”重试。
+        """
+        api_handler = None
+        try:
+            from core.api_client import APIClient
+            self.profiler.mark("导入 API 客户端(openai/httpx)")
+            api_handler = APIClient(streaming=True)
+            # 后台预热 API 连接，首次分析时无需再建立 TLS 连接
+            api_handler.warm_up()
+            self.profiler.mark("创建 API 客户端")
+        except Exception as e:
+            error = str(e)
+            print(f"初始化 API 客户端失败: {error}")
+
+        if self.tray_icon is None:
+            try:
+                from services.tray_icon import TrayIcon
+                self.tray_icon = TrayIcon(self)
+                self.profiler.mark("初始化托盘")
+            except Exception as e:
+                print(f"初始化托盘失败: {str(e)}")
+
+        if api_handler is not None:
+            self.ui.dispatcher.post(self._on_api_ready, api_handler)
+        else:
+            self.ui.dispatcher.post(self._on_api_failed, error)
+
+    def _on_api_failed(self, error):
+        self.ui.set_api_unavailable(self._retry_api_client)
+        self.profiler.report()
+        messagebox.showerror("启动错误", f"初始化 API 客户端失败: {error}\n可点击“更新密钥”重试")
+
+    def _retry_api_client(self):
+        threading.Thread(target=self._load_in_background, daemon=True).start()
+
+    def _on_api_ready(self, api_handler):
+        self.api_handler = api_handler
+        self.ui.set_api_handler(api_handler)
+        if self.selection_watcher is not None:
+            return
+        from services.text_watcher import TextSelectionWatcher
+        self.selection_watcher = TextSelectionWatcher(
+            self.ui, speculative=self.speculative, speculative_budget=self.speculative_budget
+        )
+        self.profiler.mark("启动选区监听")
+        self.profiler.report()
 
     def on_close(self, force_quit=False):
         if not force_quit:
@@ -35,23 +126,30 @@ class CalendarApp:
             self._cleanup_and_quit()     # 从托盘菜单强制退出
 
     def minimize_to_tray(self):
-        """最小化到托盘，并确保托盘图标可见"""
+        """最小化到托盘，并确保托盘图标可见
+
+        托盘尚未初始化或不可用（如非 Windows）时只最小化窗口，否则隐藏后将无法恢复。
+        """
+        if self.tray_icon and not self.tray_icon.tray_icon:  # 如果图标未运行，重新初始化
+            try:
+                self.tray_icon.setup_tray_icon()
+            except Exception as e:
+                print(f"初始化托盘失败: {str(e)}")
+        if not (self.tray_icon and self.tray_icon.tray_icon):
+            self.root.iconify()
+            return
+
         self.minimized_to_tray = True
         self.root.withdraw()  # 隐藏主窗口
-        
-        # 关键修复：确保托盘图标可见且未停止
-        if hasattr(self, 'tray_icon') and self.tray_icon:
-            if not self.tray_icon.tray_icon:  # 如果图标未运行，重新初始化
-                self.tray_icon.setup_tray_icon()
-            self.tray_icon.tray_icon.visible = True  # 强制显示
-            
+        self.tray_icon.tray_icon.visible = True  # 强制显示
         self.tray_icon.show_notification("智能日历", "程序已最小化到系统托盘")
 
     def _cleanup_and_quit(self):
         """彻底退出程序，清理资源"""
-        self.selection_watcher.running = False
-        if hasattr(self.selection_watcher, 'popup') and self.selection_watcher.popup:
-            self.selection_watcher.popup.destroy()
+        if self.selection_watcher:
+            self.selection_watcher.stop()
+            if self.selection_watcher.popup:
+                self.selection_watcher.popup.destroy()
         
         self.event_manager.save_events_to_log()
         
@@ -62,13 +160,33 @@ class CalendarApp:
         self.root.quit()
 
 
-def main():
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+    from services.watcher_engine import HELPER_FLAG
+    if argv[:1] == [HELPER_FLAG]:
+        # 打包后的程序由选区监听以此参数启动自身作为辅助进程
+        from services.watcher_engine import run_tk_helper
+        run_tk_helper()
+        return
+
+    parser = argparse.ArgumentParser(description="智能日历")
+    parser.add_argument("--speculative", action="store_true",
+                        help="选中文本后立即在后台预分析，点击添加时直接使用结果")
+    parser.add_argument("--speculative-budget", type=int, default=10,
+                        help="每分钟最多预分析请求数")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="输出启动过程中各模块导入和初始化的耗时")
+    args = parser.parse_args(argv)
+    profiler = StartupProfiler(args.profile_startup)
+
     try:
         root = tk.Tk()
         style = ttk.Style()
         style.configure('Event.TButton', foreground='red', font=('Arial', 9, 'bold'))
         style.configure('Accent.TButton', foreground='blue')
-        app = CalendarApp(root)
+        profiler.mark("创建 Tk 根窗口")
+        app = CalendarApp(root, args.speculative, args.speculative_budget, profiler)
         root.mainloop()
     except Exception as e:
         messagebox.showerror("启动错误", f"程序启动失败: {str(e)}")
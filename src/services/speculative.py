@@ -0,0 +1,79 @@
+# speculative.py
+import threading
+from collections import OrderedDict
+from core.analysis_cache import AnalysisCache
+from core.resilience import TokenBucket
+
+
+class SpeculativeAnalyzer:
+    """选区稳定后立即在后台预分析，用户点击“添加到日程”时直接使用已缓存的结果
+
+    每分钟最多发起 per_minute 次预分析 API 请求（令牌桶限流），本地可解析或已缓存的
+    文本不消耗额度。hit_rate 为被用户实际添加的预分析请求所占比例。
+    """
+
+    RECENT_LIMIT = 256
+
+    def __init__(self, api_handler, per_minute=10):
+        self.api_handler = api_handler
+        self.budget = TokenBucket(per_minute / 60.0, per_minute)
+        # {缓存键: 预分析是否已完成}
+        self._speculated = OrderedDict()
+        self._lock = threading.Lock()
+        self.started = 0
+        self.completed = 0
+        self.resolved = 0
+        self.over_budget = 0
+        self.commits = 0
+        self.hits = 0
+        self.ready_hits = 0
+
+    def speculate(self, text):
+        key = AnalysisCache.make_key(text)
+        with self._lock:
+            if key in self._speculated:
+                return
+            # 先登记再发起请求，请求很快完成时回调也能找到记录
+            self._speculated[key] = False
+            while len(self._speculated) > self.RECENT_LIMIT:
+                self._speculated.popitem(last=False)
+
+        def on_complete(success, result):
+            with self._lock:
+                if success and key in self._speculated:
+                    self._speculated[key] = True
+                    self.completed += 1
+
+        status = self.api_handler.prefetch(text, self.budget, on_complete)
+        with self._lock:
+            if status == "started":
+                self.started += 1
+                return
+            self._speculated.pop(key, None)
+            if status == "resolved":
+                self.resolved += 1
+            elif status == "budget":
+                self.over_budget += 1
+
+    def record_commit(self, text):
+        """用户确认添加时调用，统计命中情况"""
+        key = AnalysisCache.make_key(text)
+        with self._lock:
+            self.commits += 1
+            ready = self._speculated.pop(key, None)
+        if ready is not None:
+            self.hits += 1
+            if ready:
+                self.ready_hits += 1
+
+    def stats(self):
+        return {
+            "started": self.started,
+            "completed": self.completed,
+            "resolved": self.resolved,
+            "over_budget": self.over_budget,
+            "commits": self.commits,
+            "hits": self.hits,
+            "ready_hits": self.ready_hits,
+            "hit_rate": self.hits / self.started if self.started else 0.0,
+        }
@@ -1,49 +1,140 @@
 # text_watcher.py
+import hashlib
 import platform
-import subprocess
 import threading
 import time
-import pyperclip
 import tkinter as tk
+from collections import OrderedDict
 from tkinter import ttk
+from core.analysis_cache import AnalysisCache
+from services.speculative import SpeculativeAnalyzer
+from services.watcher_engine import AdaptivePoller, SelectionHelper
 
 class TextSelectionWatcher:
-    def __init__(self, parent_app):
+    # 选区停止变化这么久（毫秒）后才弹出提示
+    SETTLE_DELAY = 400
+    MIN_LENGTH = 4
+    RECENT_LIMIT = 256
+
+    def __init__(self, parent_app, speculative=False, speculative_budget=10):
         self.parent = parent_app
         self.popup = None
         self.running = True
         self.current_selection = ""
+        self._settle_id = None
+        # 最近已分析选区的规范化哈希，超过上限时淘汰最早的
+        self._recent = OrderedDict()
+        self.filtered = 0
+        # 投机预分析（默认关闭）：选区稳定后即在后台分析，点击添加时直接使用结果
+        self.speculator = None
+        if speculative:
+            self.speculator = SpeculativeAnalyzer(parent_app.api_handler, speculative_budget)
         self.system = platform.system()
+        self.selection_monitor = None
+        # macOS/Linux 通过常驻辅助进程查询选区和鼠标位置
+        self.helper = SelectionHelper(self.system)
+        self.poller = AdaptivePoller()
         self.setup_watcher()
 
     def setup_watcher(self):
         if self.system == "Windows":
             threading.Thread(target=self.windows_watcher, daemon=True).start()
         elif self.system == "Darwin":
-            threading.Thread(target=self.macos_watcher, daemon=True).start()
+            threading.Thread(target=self.poll_watcher, daemon=True).start()
+        else:
+            # 优先用 XFixes 事件监听选区变化，不可用时（无 python-xlib、非 X11 等）退回 xclip 轮询
+            from services.xfixes_selection import XFixesSelectionMonitor
+            self.selection_monitor = XFixesSelectionMonitor(
+                self.on_selection_changed, on_failure=self._on_monitor_failed
+            )
+            if not self.selection_monitor.start():
+                self.selection_monitor = None
+                threading.Thread(target=self.poll_watcher, daemon=True).start()
+
+    def _on_monitor_failed(self):
+        """XFixes 监听运行中断开且无法重连（在监听线程中调用），改用轮询继续监听"""
+        if self.running:
+            threading.Thread(target=self.poll_watcher, daemon=True).start()
+
+    def stop(self):
+        self.running = False
+        if self.selection_monitor:
+            self.selection_monitor.stop()
+        self.helper.close()
+
+    def stats(self):
+        """轮询次数、耗时、子进程启动次数及预分析命中率，便于观察监听开销"""
+        stats = {"helper": self.helper.stats(), "poller": self.poller.stats()}
+        if self.speculator:
+            stats["speculative"] = self.speculator.stats()
+        if self.selection_monitor:
+            stats["xfixes"] = {
+                "owner_changes": self.selection_monitor.owner_changes,
+                "reads": self.selection_monitor.reads,
+                "restarts": self.selection_monitor.restarts,
+                "running": self.selection_monitor.running,
+            }
+        return stats
+
+    def on_selection_changed(self, current):
+        """可在监听线程中调用；弹窗前先在主线程中等待选区稳定"""
+        if current and current != self.current_selection:
+            self.current_selection = current
+            self.parent.dispatcher.post(self._schedule_settle)
+
+    def _schedule_settle(self):
+        # 拖动选择时选区连续变化，只保留最后一次
+        if self._settle_id is not None:
+            self.parent.root.after_cancel(self._settle_id)
+        self._settle_id = self.parent.root.after(self.SETTLE_DELAY, self._selection_settled)
+
+    def _selection_settled(self):
+        self._settle_id = None
+        if self.is_worth_prompting(self.current_selection):
+            if self.speculator:
+                self.speculator.speculate(self.current_selection)
+            self.show_popup()
         else:
-            threading.Thread(target=self.linux_watcher, daemon=True).start()
+            self.filtered += 1
+
+    @staticmethod
+    def selection_hash(text):
+        return hashlib.sha256(AnalysisCache.normalize_text(text).encode('utf-8')).hexdigest()
+
+    def is_worth_prompting(self, text):
+        """过滤太短、不含文字或已经分析过的选区"""
+        normalized = AnalysisCache.normalize_text(text)
+        if len(normalized) < self.MIN_LENGTH:
+            return False
+        if not any(ch.isalpha() for ch in normalized):
+            return False
+        if any(ord(ch) < 32 and ch not in '\t\n\r' for ch in text):
+            return False
+        return self.selection_hash(text) not in self._recent
+
+    def remember_analyzed(self, text):
+        key = self.selection_hash(text)
+        self._recent[key] = True
+        self._recent.move_to_end(key)
+        while len(self._recent) > self.RECENT_LIMIT:
+            self._recent.popitem(last=False)
 
     def windows_watcher(self):
         import ctypes
         user32 = ctypes.windll.user32
 
-        last_selection = ""
         while self.running:
             try:
                 if user32.GetAsyncKeyState(0x01) & 0x8000:
                     time.sleep(0.1)
-                    current = self.get_windows_selection()
-                    if current and current != last_selection:
-                        last_selection = current
-                        self.current_selection = current
-                        self.parent.root.after(0, self.show_popup)
+                    self.on_selection_changed(self.get_windows_selection())
             except:
                 pass
             time.sleep(0.1)
 
     def get_windows_selection(self):
         import ctypes
+        import pyperclip
         user32 = ctypes.windll.user32
         CF_TEXT = 1
 
@@ -60,42 +151,31 @@ class TextSelectionWatcher:
         pyperclip.copy(backup)
         return text.strip()
 
-    def macos_watcher(self):
-        while self.running:
-            try:
-                script = 'tell application "System Events" to get the value of (attribute "AXSelectedText" of first process whose frontmost is true)'
-                current = subprocess.run(['osascript', '-e', script],
-                                       capture_output=True, text=True).stdout.strip()
-                if current and current != self.current_selection:
-                    self.current_selection = current
-                    self.parent.root.after(0, self.show_popup)
-            except:
-                pass
-            time.sleep(0.5)
-
-    def linux_watcher(self):
+    def poll_watcher(self):
+        """轮询选区：刚有变化时快速轮询，用户操作鼠标时不慢于 0.5 秒，空闲时逐步放慢"""
+        last_pointer = None
         while self.running:
+            start = time.perf_counter()
+            previous = self.current_selection
+            # 辅助进程不可用时不知道鼠标状态，按用户正在操作处理
+            active = True
             try:
-                current = subprocess.run(['xclip', '-o', '-selection', 'primary'],
-                                       capture_output=True, text=True).stdout.strip()
-                if current and current != self.current_selection:
-                    self.current_selection = current
-                    self.parent.root.after(0, self.show_popup)
-            except:
+                selection, pointer = self.helper.query("poll")
+                active = pointer is None or pointer != last_pointer
+                last_pointer = pointer
+                self.on_selection_changed(selection)
+            except Exception:
                 pass
-            time.sleep(0.5)
-
-    def show_popup(self):
-        if self.popup:
-            self.popup.destroy()
+            self.poller.record(time.perf_counter() - start, self.current_selection != previous, active)
+            self.poller.wait()
 
+    def _create_popup(self):
+        """弹窗只创建一次，之后隐藏/显示并移动位置"""
         self.popup = tk.Toplevel(self.parent.root)
+        self.popup.withdraw()
         self.popup.overrideredirect(True)
         self.popup.attributes('-topmost', True)
 
-        x, y = self.get_mouse_position()
-        self.popup.geometry(f"+{x+15}+{y+15}")
-
         frame = ttk.Frame(self.popup, padding=3)
         frame.pack()
 
@@ -109,12 +189,24 @@ class TextSelectionWatcher:
         ttk.Button(
             frame,
             text="×",
-            command=self.popup.destroy,
+            command=self.hide_popup,
             width=2
         ).pack(side=tk.LEFT)
 
-        self.popup.bind("<FocusOut>", lambda e: self.popup.destroy())
+        self.popup.bind("<FocusOut>", lambda e: self.hide_popup())
+        # 计算出实际尺寸，供 adjust_popup_position 判断是否超出屏幕
+        self.popup.update_idletasks()
+
+    def show_popup(self):
+        if not self.popup or not self.popup.winfo_exists():
+            self._create_popup()
         self.adjust_popup_position()
+        self.popup.deiconify()
+        self.popup.lift()
+
+    def hide_popup(self):
+        if self.popup and self.popup.winfo_exists():
+            self.popup.withdraw()
 
     def get_mouse_position(self):
         if self.system == "Windows":
@@ -124,21 +216,15 @@ class TextSelectionWatcher:
             pt = POINT()
             ctypes.windll.user32.GetCursorPos(ctypes.byref(pt))
             return (pt.x, pt.y)
-        elif self.system == "Darwin":
-            script = 'tell application "System Events" to {set theMouse to mouse position}'
-            result = subprocess.run(['osascript', '-e', script],
-                                  capture_output=True, text=True).stdout
-            x, y = map(int, result.strip().split(', '))
-            return (x, y)
-        else:
-            try:
-                output = subprocess.check_output(['xdotool', 'getmouselocation']).decode()
-                parts = output.split()
-                x = int(parts[0].split(':')[1])
-                y = int(parts[1].split(':')[1])
-                return (x, y)
-            except:
-                return (100, 100)
+        # 在界面线程中调用：直接向本进程的 Tk 查询，不等待辅助进程（其锁可能正被轮询线程占用）
+        try:
+            x, y = self.parent.root.winfo_pointerxy()
+        except tk.TclError:
+            return (100, 100)
+        if x < 0 or y < 0:
+            # 鼠标在其他屏幕上
+            return (100, 100)
+        return (x, y)
 
     def adjust_popup_position(self):
         if not self.popup:
@@ -163,8 +249,10 @@ class TextSelectionWatcher:
 
     def add_to_schedule(self):
         if self.current_selection:
+            self.remember_analyzed(self.current_selection)
+            if self.speculator:
+                self.speculator.record_commit(self.current_selection)
             self.parent.text_input.delete(1.0, tk.END)
             self.parent.text_input.insert(tk.END, self.current_selection)
-            self.parent.analyze_text()
-        if self.popup:
-            self.popup.destroy()
+            self.parent.analyze_text(source="selection")
+        self.hide_popup()
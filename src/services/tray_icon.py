@@ -1,9 +1,6 @@
 # tray_icon.py
 import platform
 import threading
-import pystray
-from PIL import Image
-import win10toast
 
 class TrayIcon:
     def __init__(self, app):
@@ -13,6 +10,10 @@ class TrayIcon:
 
     def setup_tray_icon(self):
         if platform.system() == "Windows":
+            # 托盘依赖只在 Windows 上用到，启动时不导入
+            import pystray
+            from PIL import Image
+
             image = Image.new('RGB', (64, 64), 'white')
             
             menu = pystray.Menu(
@@ -30,7 +31,8 @@ class TrayIcon:
             threading.Thread(target=self.tray_icon.run, daemon=True).start()
 
     def restore_from_tray(self, icon, item):
-        self.app.root.after(0, self._restore_window)
+        # 托盘菜单回调运行在托盘线程中
+        self.app.ui.dispatcher.post(self._restore_window)
 
     def _restore_window(self):
         self.app.root.deiconify()
@@ -39,7 +41,7 @@ class TrayIcon:
             self.tray_icon.visible = False
 
     def quit_application(self, icon, item):
-        self.app.root.after(0, self._quit_app)
+        self.app.ui.dispatcher.post(self._quit_app)
 
     def _quit_app(self):
         self.app.on_close(force_quit=True)
@@ -50,6 +52,7 @@ class TrayIcon:
     def show_notification(self, title, message):
         if platform.system() == "Windows":
             try:
+                import win10toast
                 toaster = win10toast.ToastNotifier()
                 toaster.show_toast(
                     title,
@@ -0,0 +1,294 @@
+# watcher_engine.py
+"""选区监听的轮询引擎
+
+AdaptivePoller：选区刚变化时快速轮询，之后每次无变化就放慢。鼠标在移动或按下时
+（用户正在操作）间隔不超过 active_interval（0.5 秒，即原来的固定间隔）；鼠标静止时
+逐步增大到 max_interval（5 秒），空闲时的唤醒次数减少一个数量级。鼠标位置与选区在
+同一次辅助进程查询（poll）中返回，不增加查询次数。
+
+SelectionHelper：启动一个常驻辅助进程，通过管道逐行回答 selection / mouse 查询，
+不再每次查询都启动 xclip、osascript 或 xdotool。
+  - Linux(X11)：辅助进程为隐藏窗口的 Tk 解释器，用 selection_get/winfo_pointerxy 查询；
+    打包后的程序无法用 -c 运行脚本，改为以 HELPER_FLAG 参数启动程序自身（见 main.py）
+  - macOS：辅助进程为常驻的 osascript(JavaScript)，通过 System Events 和 NSEvent 查询
+辅助进程无法启动时（无图形环境等）退回每次查询启动一个子进程。
+"""
+import json
+import select
+import subprocess
+import sys
+import threading
+import time
+
+# 以此参数启动主程序时只运行 Linux 辅助进程（打包后的程序使用）
+HELPER_FLAG = "--selection-helper"
+
+# Linux 辅助进程：每行一个查询命令，每行返回一个 JSON 结果
+TK_HELPER_SOURCE = r"""
+import json, sys
+import tkinter as tk
+root = tk.Tk()
+root.withdraw()
+sys.stdout.write(json.dumps("ready") + "\n")
+sys.stdout.flush()
+def selection():
+    try:
+        return root.selection_get(selection="PRIMARY", type="UTF8_STRING")
+    except tk.TclError:
+        return ""
+for line in sys.stdin:
+    command = line.strip()
+    try:
+        if command == "selection":
+            value = selection()
+        elif command == "mouse":
+            value = list(root.winfo_pointerxy())
+        elif command == "poll":
+            # Tk 无法查询全局按键状态，只返回位置
+            value = [selection(), list(root.winfo_pointerxy()) + [0]]
+        else:
+            value = None
+    except Exception:
+        value = None
+    sys.stdout.write(json.dumps(value) + "\n")
+    sys.stdout.flush()
+"""
+
+# macOS 辅助进程（JavaScript for Automation），协议同上
+MACOS_HELPER_SOURCE = r"""
+ObjC.import('Foundation');
+ObjC.import('AppKit');
+var events = Application('System Events');
+var input = $.NSFileHandle.fileHandleWithStandardInput;
+var output = $.NSFileHandle.fileHandleWithStandardOutput;
+function reply(value) {
+    output.writeData($(JSON.stringify(value) + '\n').dataUsingEncoding($.NSUTF8StringEncoding));
+}
+function selection() {
+    var process = events.processes.whose({frontmost: true})[0];
+    return process.attributes.byName('AXSelectedText').value() || '';
+}
+function mouse() {
+    var point = $.NSEvent.mouseLocation;
+    var height = $.NSScreen.mainScreen.frame.size.height;
+    return [Math.round(point.x), Math.round(height - point.y)];
+}
+function answer(command) {
+    if (command == 'selection') {
+        return selection();
+    }
+    if (command == 'mouse') {
+        return mouse();
+    }
+    if (command == 'poll') {
+        return [selection(), mouse().concat([$.NSEvent.pressedMouseButtons])];
+    }
+    return null;
+}
+reply('ready');
+var buffer = '';
+while (true) {
+    var data = input.availableData;
+    if (data.length == 0) break;
+    buffer += $.NSString.alloc.initWithDataEncoding(data, $.NSUTF8StringEncoding).js;
+    var lines = buffer.split('\n');
+    buffer = lines.pop();
+    lines.forEach(function (command) {
+        try { reply(answer(command.trim())); } catch (e) { reply(null); }
+    });
+}
+"""
+
+
+def run_tk_helper():
+    """在当前进程中运行 Linux 辅助进程的查询循环，直到标准输入关闭"""
+    exec(TK_HELPER_SOURCE, {"__name__": "__main__"})
+
+
+class AdaptivePoller:
+    """按结果是否变化及用户是否在操作调整轮询间隔，并统计轮询次数与耗时"""
+
+    def __init__(self, min_interval=0.1, active_interval=0.5, max_interval=5.0, backoff=1.5):
+        self.min_interval = min_interval
+        self.active_interval = active_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.interval = min_interval
+        self.polls = 0
+        self.changes = 0
+        self.active_polls = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    def record(self, latency, changed, active=False):
+        """changed：选区有变化；active：两次轮询之间鼠标移动或按键（用户正在操作）"""
+        self.polls += 1
+        self.total_latency += latency
+        self.max_latency = max(self.max_latency, latency)
+        if changed:
+            self.changes += 1
+            self.interval = self.min_interval
+        elif active:
+            self.active_polls += 1
+            self.interval = min(self.active_interval, self.interval * self.backoff)
+        else:
+            self.interval = min(self.max_interval, self.interval * self.backoff)
+
+    def wait(self):
+        time.sleep(self.interval)
+
+    def stats(self):
+        return {
+            "polls": self.polls,
+            "changes": self.changes,
+            "active_polls": self.active_polls,
+            "interval": self.interval,
+            "avg_latency": self.total_latency / self.polls if self.polls else 0.0,
+            "max_latency": self.max_latency,
+        }
+
+
+class SelectionHelper:
+    """常驻辅助进程的客户端，可在多个线程中调用 query()"""
+
+    MAX_FAILURES = 3
+
+    def __init__(self, system, timeout=2.0):
+        self.system = system
+        self.timeout = timeout
+        self.process = None
+        # 辅助进程启动失败或多次崩溃后不再尝试，直接使用单次子进程
+        self.available = True
+        self.spawns = 0
+        self.queries = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+
+    def _helper_command(self):
+        if self.system == "Darwin":
+            return ['osascript', '-l', 'JavaScript', '-e', MACOS_HELPER_SOURCE]
+        if self.system == "Windows":
+            # Windows 在进程内即可查询
+            return None
+        if getattr(sys, 'frozen', False):
+            return [sys.executable, HELPER_FLAG]
+        return [sys.executable, '-c', TK_HELPER_SOURCE]
+
+    def _start(self):
+        command = self._helper_command()
+        if command is None:
+            self.available = False
+            return False
+        try:
+            self.process = subprocess.Popen(
+                command,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                text=True,
+                encoding='utf-8',
+                bufsize=1
+            )
+            self.spawns += 1
+            if self._read_reply() != "ready":
+                raise OSError("辅助进程未就绪")
+            return True
+        except Exception as e:
+            print(f"启动选区辅助进程失败: {str(e)}")
+            self._kill()
+            self.available = False
+            return False
+
+    def _read_reply(self):
+        stdout = self.process.stdout
+        readable, _, _ = select.select([stdout], [], [], self.timeout)
+        if not readable:
+            raise TimeoutError("辅助进程响应超时")
+        line = stdout.readline()
+        if not line:
+            raise OSError("辅助进程已退出")
+        return json.loads(line)
+
+    def _kill(self):
+        if self.process is not None:
+            try:
+                self.process.kill()
+                self.process.wait(timeout=1)
+            except Exception:
+                pass
+            self.process = None
+
+    def close(self):
+        with self._lock:
+            self._kill()
+
+    def query(self, command):
+        """command 为 "selection"（返回字符串）、"mouse"（返回 (x, y) 或 None）
+        或 "poll"（返回 (选区, (x, y, 按键) 或 None)）"""
+        with self._lock:
+            self.queries += 1
+            if self.available and (self.process is None or self.process.poll() is not None):
+                self._start()
+            if self.process is not None:
+                try:
+                    self.process.stdin.write(command + "\n")
+                    self.process.stdin.flush()
+                    value = self._read_reply()
+                    return self._normalize(command, value)
+                except Exception as e:
+                    print(f"选区辅助进程查询失败: {str(e)}")
+                    self._kill()
+                    self.failures += 1
+                    if self.failures >= self.MAX_FAILURES:
+                        self.available = False
+            return self._query_once(command)
+
+    @staticmethod
+    def _normalize(command, value):
+        if command == "mouse":
+            return tuple(value) if value else None
+        if command == "poll":
+            text, pointer = value if value else ("", None)
+            return (text or "").strip(), tuple(pointer) if pointer else None
+        return (value or "").strip()
+
+    def _query_once(self, command):
+        """退回方式：每次查询启动一个子进程；poll 不再额外查询鼠标"""
+        if command == "poll":
+            return self._query_once("selection"), None
+        if self.system == "Darwin":
+            if command == "selection":
+                script = 'tell application "System Events" to get the value of (attribute "AXSelectedText" of first process whose frontmost is true)'
+            else:
+                script = 'tell application "System Events" to {set theMouse to mouse position}'
+            args = ['osascript', '-e', script]
+        elif command == "selection":
+            args = ['xclip', '-o', '-selection', 'primary']
+        else:
+            args = ['xdotool', 'getmouselocation']
+
+        self.spawns += 1
+        try:
+            output = subprocess.run(args, capture_output=True, text=True).stdout.strip()
+        except OSError:
+            return "" if command == "selection" else None
+        if command == "selection":
+            return output
+        try:
+            if self.system == "Darwin":
+                x, y = map(int, output.split(', '))
+            else:
+                parts = output.split()
+                x = int(parts[0].split(':')[1])
+                y = int(parts[1].split(':')[1])
+            return (x, y)
+        except (ValueError, IndexError):
+            return None
+
+    def stats(self):
+        return {
+            "spawns": self.spawns,
+            "queries": self.queries,
+            "failures": self.failures,
+            "persistent": self.process is not None,
+        }
@@ -0,0 +1,182 @@
+# xfixes_selection.py
+"""基于 XFixes 的 PRIMARY 选区监听（Linux/X11）
+
+订阅选区所有者变化事件，只在选区真正变化时读取一次内容，不再定时启动 xclip。
+需要 python-xlib 和支持 XFIXES 扩展的 X 服务器；不可用时 start() 返回 False，
+调用方应退回轮询方式。运行中连接出错时自动重连，重连失败则调用 on_failure()，
+调用方此时应改用轮询。
+
+可在 Xvfb 下单独验证：
+    Xvfb :99 & DISPLAY=:99 python -m services.xfixes_selection
+    DISPLAY=:99 sh -c 'echo 明天下午3点开会 | xclip -i -selection primary'
+"""
+import select
+import threading
+import time
+
+
+class XFixesSelectionMonitor:
+    # 运行中断开后最多连续重连次数及间隔（秒）；连接正常运行超过 HEALTHY_PERIOD 秒后重新计数
+    MAX_RESTARTS = 3
+    RESTART_DELAY = 1.0
+    HEALTHY_PERIOD = 60.0
+
+    def __init__(self, on_change, display_name=None, on_failure=None):
+        # on_change(text) 和 on_failure() 在监听线程中调用
+        self.on_change = on_change
+        self.on_failure = on_failure
+        self.display_name = display_name
+        self.running = False
+        self.owner_changes = 0
+        self.reads = 0
+        self.restarts = 0
+        self._display = None
+        self._thread = None
+
+    def start(self):
+        """连接 X 服务器并开始监听；环境不支持时返回 False"""
+        try:
+            from Xlib import X
+        except ImportError:
+            return False
+
+        try:
+            disp = self._connect()
+        except Exception as e:
+            print(f"XFixes 选区监听不可用: {str(e)}")
+            return False
+        if disp is None:
+            return False
+
+        self._X = X
+        self._display = disp
+        self.running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return True
+
+    def _connect(self):
+        """打开连接并订阅 PRIMARY 选区所有者变化；服务器不支持 XFIXES 时返回 None"""
+        from Xlib import display
+        from Xlib.ext import xfixes
+
+        disp = display.Display(self.display_name)
+        try:
+            if not disp.has_extension('XFIXES'):
+                disp.close()
+                return None
+            disp.xfixes_query_version()
+
+            screen = disp.screen()
+            self._primary = disp.get_atom('PRIMARY')
+            self._utf8 = disp.get_atom('UTF8_STRING')
+            self._incr = disp.get_atom('INCR')
+            self._property = disp.get_atom('CALENDAR_SELECTION')
+            # 接收选区内容的隐藏窗口
+            self._window = screen.root.create_window(0, 0, 1, 1, 0, screen.root_depth)
+            disp.xfixes_select_selection_input(
+                screen.root, self._primary, xfixes.XFixesSetSelectionOwnerNotifyMask
+            )
+            disp.flush()
+        except Exception:
+            disp.close()
+            raise
+        return disp
+
+    def stop(self):
+        self.running = False
+
+    def _run(self):
+        """监听直到 stop()；连接出错时重连，重连失败则通知调用方改用轮询"""
+        failures = 0
+        while self.running:
+            started = time.monotonic()
+            try:
+                self._listen(self._display)
+            except Exception as e:
+                print(f"XFixes 选区监听出错: {str(e)}")
+            finally:
+                self._close(self._display)
+            if time.monotonic() - started > self.HEALTHY_PERIOD:
+                failures = 0
+            while self.running and failures < self.MAX_RESTARTS:
+                failures += 1
+                if self._reconnect():
+                    break
+            else:
+                if self.running:
+                    self.running = False
+                    print("XFixes 选区监听已停止，改用轮询")
+                    if self.on_failure is not None:
+                        self.on_failure()
+
+    def _reconnect(self):
+        time.sleep(self.RESTART_DELAY)
+        try:
+            disp = self._connect()
+        except Exception as e:
+            print(f"XFixes 选区监听重连失败: {str(e)}")
+            return False
+        if disp is None:
+            return False
+        self._display = disp
+        self.restarts += 1
+        return True
+
+    def _listen(self, disp):
+        X = self._X
+        owner_notify = disp.extension_event.SetSelectionOwnerNotify
+        while self.running:
+            # 带超时等待，以便 stop() 后线程能退出
+            readable, _, _ = select.select([disp], [], [], 1.0)
+            if not readable and not disp.pending_events():
+                continue
+            while disp.pending_events():
+                event = disp.next_event()
+                if (event.type, getattr(event, 'sub_code', None)) == owner_notify:
+                    # 选区所有者变化：请求转换为 UTF-8 文本，结果通过 SelectionNotify 返回
+                    self.owner_changes += 1
+                    self._window.convert_selection(
+                        self._primary, self._utf8, self._property, X.CurrentTime
+                    )
+                    disp.flush()
+                elif event.type == X.SelectionNotify and event.requestor == self._window.id:
+                    text = self._read_property(event)
+                    if text:
+                        try:
+                            self.on_change(text)
+                        except Exception as e:
+                            # 回调出错不应中断监听
+                            print(f"处理选区变化失败: {str(e)}")
+
+    @staticmethod
+    def _close(disp):
+        try:
+            disp.close()
+        except Exception:
+            pass
+
+    def _read_property(self, event):
+        if event.property == self._X.NONE:
+            return ""
+        prop = self._window.get_full_property(self._property, self._X.AnyPropertyType)
+        self._window.delete_property(self._property)
+        if prop is None or prop.property_type == self._incr:
+            # 超大选区需要 INCR 分段传输，不作处理
+            return ""
+        self.reads += 1
+        value = prop.value
+        if isinstance(value, bytes):
+            value = value.decode('utf-8', errors='replace')
+        return value.strip()
+
+
+if __name__ == "__main__":
+    monitor = XFixesSelectionMonitor(lambda text: print(f"选区变化: {text!r}", flush=True))
+    if not monitor.start():
+        raise SystemExit("XFixes 不可用")
+    print("正在监听 PRIMARY 选区，Ctrl+C 退出")
+    try:
+        monitor._thread.join()
+    except KeyboardInterrupt:
+        monitor.stop()
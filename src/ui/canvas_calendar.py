@@ -0,0 +1,227 @@
+# canvas_calendar.py
+import calendar
+import tkinter as tk
+from tkinter import ttk
+from datetime import datetime
+
+
+class CanvasCalendar:
+    """连续滚动的多月日历视图
+
+    所有月份按固定高度纵向排列在一个 Canvas 中，日期格用矩形和文字绘制，
+    点击时按坐标换算出日期，不为每一天创建控件。只绘制可见的月份：
+    滚出视口的月份的画布元素放回池中，供新滚入的月份移动坐标后复用，
+    因此无论范围跨多少年，画布上的元素数量只与可见月份数有关。
+    每天的事件数来自 summary_provider(year, month) 返回的 {日: 事件数}。
+    """
+
+    HEADER_HEIGHT = 28
+    CELL_HEIGHT = 34
+    MONTH_GAP = 12
+    PADDING = 8
+    MIN_CELL_WIDTH = 32
+
+    def __init__(self, parent, summary_provider, on_day_click, first_year=2000, last_year=2100):
+        self.summary_provider = summary_provider
+        self.on_day_click = on_day_click
+        self.first_year = first_year
+        self.month_count = (last_year - first_year + 1) * 12
+        self.month_height = self.HEADER_HEIGHT + 6 * self.CELL_HEIGHT + self.MONTH_GAP
+        self.cell_width = 48
+        self.selected = None
+
+        self.frame = ttk.Frame(parent)
+        self.weekday_canvas = tk.Canvas(self.frame, height=22, highlightthickness=0, background='#f5f5f5')
+        self.weekday_canvas.pack(side=tk.TOP, fill=tk.X)
+        self.scrollbar = ttk.Scrollbar(self.frame, command=self._yview)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.canvas = tk.Canvas(
+            self.frame,
+            highlightthickness=0,
+            background='#f5f5f5',
+            yscrollcommand=self.scrollbar.set,
+            yscrollincrement=self.CELL_HEIGHT
+        )
+        self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.canvas.configure(scrollregion=(0, 0, 0, self.month_count * self.month_height))
+
+        # {月份序号: 画布元素组}，以及可复用的空闲元素组
+        self._slots = {}
+        self._pool = []
+        # {(年, 月): {日: 事件数}}，数据变化时由 invalidate 清除
+        self._summaries = {}
+
+        self.canvas.bind("<Configure>", self._on_configure)
+        self.canvas.bind("<Button-1>", self._on_click)
+        self.canvas.bind("<MouseWheel>", self._on_mousewheel)
+        self.canvas.bind("<Button-4>", lambda e: self._scroll_units(-1))
+        self.canvas.bind("<Button-5>", lambda e: self._scroll_units(1))
+
+    def pack(self, **kwargs):
+        self.frame.pack(**kwargs)
+
+    def pack_forget(self):
+        self.frame.pack_forget()
+
+    def scroll_to(self, year, month):
+        """滚动到指定月份，使其位于视口顶部"""
+        index = (year - self.first_year) * 12 + month - 1
+        index = max(0, min(self.month_count - 1, index))
+        self.canvas.yview_moveto(index / self.month_count)
+        self.render()
+
+    def invalidate(self, year, month):
+        """某月事件变化后丢弃其统计缓存，若该月可见则立即重绘"""
+        self._summaries.pop((year, month), None)
+        index = (year - self.first_year) * 12 + month - 1
+        slot = self._slots.get(index)
+        if slot is not None:
+            self._draw_month(slot, index)
+
+    def invalidate_all(self):
+        self._summaries.clear()
+        for index, slot in self._slots.items():
+            self._draw_month(slot, index)
+
+    def select(self, day, year, month):
+        previous = self.selected
+        self.selected = (year, month, day)
+        for selected in (previous, self.selected):
+            if selected is not None:
+                index = (selected[0] - self.first_year) * 12 + selected[1] - 1
+                slot = self._slots.get(index)
+                if slot is not None:
+                    self._draw_month(slot, index)
+
+    def render(self):
+        """根据当前滚动位置回收不可见的月份并绘制新进入视口的月份"""
+        top = self.canvas.canvasy(0)
+        bottom = top + self.canvas.winfo_height()
+        first = max(0, int(top // self.month_height))
+        last = min(self.month_count - 1, int(bottom // self.month_height))
+
+        for index in [i for i in self._slots if i < first or i > last]:
+            slot = self._slots.pop(index)
+            for item in slot["items"]:
+                self.canvas.itemconfigure(item, state='hidden')
+            self._pool.append(slot)
+
+        for index in range(first, last + 1):
+            if index not in self._slots:
+                slot = self._pool.pop() if self._pool else self._create_slot()
+                self._slots[index] = slot
+                self._draw_month(slot, index)
+
+    def _create_slot(self):
+        canvas = self.canvas
+        title = canvas.create_text(0, 0, anchor='w', font=('Arial', 11, 'bold'), fill='#333333')
+        cells = []
+        items = [title]
+        for _ in range(42):
+            rect = canvas.create_rectangle(0, 0, 0, 0, outline='#dddddd')
+            day_text = canvas.create_text(0, 0, font=('Arial', 10))
+            count_text = canvas.create_text(0, 0, anchor='se', font=('Arial', 7))
+            cells.append((rect, day_text, count_text))
+            items.extend((rect, day_text, count_text))
+        return {"title": title, "cells": cells, "items": items}
+
+    def _month_of(self, index):
+        year, month = divmod(index, 12)
+        return self.first_year + year, month + 1
+
+    def _summary(self, year, month):
+        summary = self._summaries.get((year, month))
+        if summary is None:
+            summary = self.summary_provider(year, month)
+            self._summaries[(year, month)] = summary
+        return summary
+
+    def _draw_month(self, slot, index):
+        canvas = self.canvas
+        year, month = self._month_of(index)
+        weeks = calendar.monthcalendar(year, month)
+        summary = self._summary(year, month)
+        today = datetime.now()
+        top = index * self.month_height
+        width = self.cell_width
+
+        canvas.coords(slot["title"], self.PADDING, top + self.HEADER_HEIGHT / 2)
+        canvas.itemconfigure(slot["title"], text=f"{year}年{month}月", state='normal')
+
+        for cell, (rect, day_text, count_text) in enumerate(slot["cells"]):
+            row, col = divmod(cell, 7)
+            day = weeks[row][col] if row < len(weeks) else 0
+            if day == 0:
+                for item in (rect, day_text, count_text):
+                    canvas.itemconfigure(item, state='hidden')
+                continue
+
+            x0 = self.PADDING + col * width
+            y0 = top + self.HEADER_HEIGHT + row * self.CELL_HEIGHT
+            count = summary.get(day, 0)
+            if (day, month, year) == (today.day, today.month, today.year):
+                fill, text_color = '#50c878', 'white'
+            elif count:
+                fill, text_color = '#4a90e2', 'white'
+            else:
+                fill, text_color = 'white', '#333333'
+            is_selected = self.selected == (year, month, day)
+
+            canvas.coords(rect, x0 + 1, y0 + 1, x0 + width - 1, y0 + self.CELL_HEIGHT - 1)
+            canvas.itemconfigure(
+                rect, fill=fill, state='normal',
+                outline='#e67e22' if is_selected else '#dddddd',
+                width=2 if is_selected else 1
+            )
+            canvas.coords(day_text, x0 + width / 2, y0 + self.CELL_HEIGHT / 2)
+            canvas.itemconfigure(day_text, text=str(day), fill=text_color, state='normal')
+            canvas.coords(count_text, x0 + width - 3, y0 + self.CELL_HEIGHT - 2)
+            canvas.itemconfigure(
+                count_text, text=str(count) if count else "", fill=text_color, state='normal'
+            )
+
+    def _draw_weekdays(self):
+        self.weekday_canvas.delete("all")
+        for col, name in enumerate(["一", "二", "三", "四", "五", "六", "日"]):
+            self.weekday_canvas.create_text(
+                self.PADDING + (col + 0.5) * self.cell_width, 11,
+                text=name, font=('Arial', 10, 'bold'), fill='#333333'
+            )
+
+    def _on_configure(self, event):
+        cell_width = max(self.MIN_CELL_WIDTH, (event.width - 2 * self.PADDING) // 7)
+        if cell_width != self.cell_width:
+            self.cell_width = cell_width
+            self._draw_weekdays()
+            for index, slot in self._slots.items():
+                self._draw_month(slot, index)
+        self.render()
+
+    def _yview(self, *args):
+        self.canvas.yview(*args)
+        self.render()
+
+    def _scroll_units(self, units):
+        self.canvas.yview_scroll(units, "units")
+        self.render()
+
+    def _on_mousewheel(self, event):
+        self._scroll_units(-1 if event.delta > 0 else 1)
+
+    def _on_click(self, event):
+        """由点击坐标换算出日期"""
+        x = self.canvas.canvasx(event.x) - self.PADDING
+        y = self.canvas.canvasy(event.y)
+        index = int(y // self.month_height)
+        offset = y - index * self.month_height - self.HEADER_HEIGHT
+        if not 0 <= index < self.month_count or offset < 0 or x < 0:
+            return
+        row, col = int(offset // self.CELL_HEIGHT), int(x // self.cell_width)
+        if row >= 6 or col >= 7:
+            return
+        year, month = self._month_of(index)
+        weeks = calendar.monthcalendar(year, month)
+        day = weeks[row][col] if row < len(weeks) else 0
+        if day:
+            self.select(day, year, month)
+            self.on_day_click(day, year, month)
@@ -0,0 +1,62 @@
+# dispatcher.py
+import queue
+
+
+class MainThreadDispatcher:
+    """把后台线程的回调转交给 Tk 主线程执行
+
+    后台线程只调用 post() 把 (函数, 参数) 放入 SimpleQueue（线程安全，不触碰 Tk），
+    主线程用 after 定时取出执行，每次最多执行 max_batch 个。
+    有任务时按 busy_interval 频繁检查，空闲时逐步放慢到 idle_interval。
+    """
+
+    def __init__(self, root, busy_interval=10, idle_interval=100, max_batch=200):
+        self.root = root
+        self.busy_interval = busy_interval
+        self.idle_interval = idle_interval
+        self.max_batch = max_batch
+        self._queue = queue.SimpleQueue()
+        self._interval = busy_interval
+        self._after_id = None
+        self.dispatched = 0
+        self.largest_batch = 0
+
+    def start(self):
+        if self._after_id is None:
+            self._after_id = self.root.after(self._interval, self._pump)
+
+    def stop(self):
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+
+    def post(self, func, *args):
+        """可在任意线程调用：稍后在主线程中执行 func(*args)"""
+        self._queue.put((func, args))
+
+    def wrap(self, func):
+        """返回一个可在任意线程调用的函数，实际调用转到主线程执行"""
+        def posted(*args):
+            self.post(func, *args)
+        return posted
+
+    def _pump(self):
+        processed = 0
+        while processed < self.max_batch:
+            try:
+                func, args = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            processed += 1
+            try:
+                func(*args)
+            except Exception as e:
+                print(f"执行界面回调失败: {str(e)}")
+
+        self.dispatched += processed
+        self.largest_batch = max(self.largest_batch, processed)
+        if processed:
+            self._interval = self.busy_interval
+        else:
+            self._interval = min(self.idle_interval, self._interval * 2)
+        self._after_id = self.root.after(self._interval, self._pump)
@@ -4,19 +4,39 @@ from tkinter import ttk, messagebox, scrolledtext
 import calendar
 from datetime import datetime
 import json
+from core.models import Event
+from ui.canvas_calendar import CanvasCalendar
+from ui.dispatcher import MainThreadDispatcher
+from ui.refresh_scheduler import RefreshScheduler
 
 class CalendarUI:
     
-    def __init__(self, root, event_manager, api_handler):
+    def __init__(self, root, event_manager, api_handler=None):
         self.root = root
         self.root.title("📅 智能日历管理系统")
         self.event_manager = event_manager
         self.api_handler = api_handler
+        # API 客户端创建失败时由 set_api_unavailable 设置的重试函数
+        self._api_retry = None
         self.current_year = datetime.now().year
         self.current_month = datetime.now().month
         self.root.geometry("900x750")
         self.selected_day = None
-        self.is_analyzing = False
+        # 已提交但尚未返回的分析请求数
+        self.pending_analyses = 0
+        # 删除选中事项后，刷新列表时要选中的行号
+        self._select_index = None
+
+        # 后台线程（API 回调、选区监听、托盘）的结果统一经此队列转到主线程处理
+        self.dispatcher = MainThreadDispatcher(self.root)
+        self.dispatcher.start()
+
+        # 数据变化只标记需要刷新的区域，同一轮事件处理中合并为一次重绘
+        self.refresh = RefreshScheduler(self.root)
+        self.refresh.register("grid", self._redraw_grid)
+        self.refresh.register("days", self._redraw_days)
+        self.refresh.register("day_list", self._redraw_day_list)
+        self.refresh.register("detail", self._on_event_selected)
         
         # 设置主题和样式
         self.style = ttk.Style()
@@ -93,17 +113,18 @@ class CalendarUI:
         
         ttk.Label(api_inner_frame, text="DeepSeek API 密钥:").pack(side=tk.LEFT, padx=(0, 5))
         self.api_entry = ttk.Entry(api_inner_frame, width=50)
-        saved_key = self.api_handler.load_api_key()
-        if saved_key:
-            self.api_entry.insert(0, saved_key)
+        # APIClient 初始化时已加载密钥，这里直接复用；客户端尚在后台创建时由 set_api_handler 填入
+        if self.api_handler is not None and self.api_handler.api_key:
+            self.api_entry.insert(0, self.api_handler.api_key)
         self.api_entry.pack(side=tk.LEFT, expand=True, fill=tk.X, padx=5)
         
-        ttk.Button(
+        self.btn_update_api = ttk.Button(
             api_inner_frame, 
             text="更新密钥", 
             command=self.update_api,
             style='Accent.TButton'
-        ).pack(side=tk.LEFT)
+        )
+        self.btn_update_api.pack(side=tk.LEFT)
 
         # 输入区域
         input_frame = ttk.LabelFrame(self.top_frame, text="📝 事件输入", padding=10)
@@ -129,6 +150,9 @@ class CalendarUI:
             style='Accent.TButton'
         )
         self.btn_analyze.pack(side=tk.RIGHT)
+        if self.api_handler is None:
+            self.btn_update_api.config(state='disabled')
+            self.btn_analyze.config(state='disabled')
 
         # 日历控制区域
         control_frame = ttk.Frame(self.top_frame)
@@ -195,6 +219,15 @@ class CalendarUI:
             padding=(10, 5)
             ).pack(side=tk.RIGHT)
 
+        # 连续多月视图开关
+        self.continuous_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            control_frame,
+            text="连续视图",
+            variable=self.continuous_var,
+            command=self.toggle_continuous_view
+        ).pack(side=tk.RIGHT, padx=5)
+
         # 日历显示区域
         self.calendar_container = ttk.Frame(self.bottom_paned)
         self.bottom_paned.add(self.calendar_container, weight=1)
@@ -219,6 +252,9 @@ class CalendarUI:
         self.calendar_vscroll.config(command=self.calendar_canvas.yview)
         self.calendar_hscroll.config(command=self.calendar_canvas.xview)
         
+        # 连续多月视图（首次切换时创建）
+        self.multi_month_view = None
+
         # 日历框架
         self.calendar_frame = ttk.Frame(self.calendar_canvas)
         self.calendar_canvas.create_window((0, 0), window=self.calendar_frame, anchor="nw")
@@ -242,27 +278,6 @@ class CalendarUI:
         )
         self.event_paned.add(self.event_buttons_frame, weight=2)
 
-        # 当天事项滚动区域
-        self.events_canvas = tk.Canvas(self.event_buttons_frame, highlightthickness=0)
-        self.events_canvas.pack(side=tk.TOP, fill=tk.BOTH, expand=True)
-        
-        self.events_scroll = ttk.Scrollbar(
-            self.event_buttons_frame,
-            orient="vertical",
-            command=self.events_canvas.yview
-        )
-        self.events_scroll.pack(side=tk.RIGHT, fill=tk.Y)
-        self.events_canvas.configure(yscrollcommand=self.events_scroll.set)
-        
-        self.events_inner_frame = ttk.Frame(self.events_canvas)
-        self.events_canvas.create_window((0, 0), window=self.events_inner_frame, anchor="nw")
-        
-        self.events_inner_frame.bind(
-            "<Configure>",
-            lambda e: self.events_canvas.configure(
-                scrollregion=self.events_canvas.bbox("all"))
-        )
-
         # 删除按钮（在当天事项区域内底部）
         self.btn_delete_day = ttk.Button(
             self.event_buttons_frame,
@@ -273,6 +288,43 @@ class CalendarUI:
         )
         self.btn_delete_day.pack(side=tk.BOTTOM, fill=tk.X, pady=(10, 0))
 
+        self.btn_delete_event = ttk.Button(
+            self.event_buttons_frame,
+            text="✕ 删除选中事项",
+            command=self.delete_selected_event,
+            state='disabled',
+            style='Danger.TButton'
+        )
+        self.btn_delete_event.pack(side=tk.BOTTOM, fill=tk.X, pady=(10, 0))
+
+        # 当天事项列表：Treeview 只绘制可见的行，一天有数百个事项也能快速显示
+        self.events_scroll = ttk.Scrollbar(self.event_buttons_frame, orient="vertical")
+        self.events_scroll.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self.events_tree = ttk.Treeview(
+            self.event_buttons_frame,
+            columns=("time", "activity", "location"),
+            show="headings",
+            selectmode="browse",
+            yscrollcommand=self.events_scroll.set
+        )
+        for column, heading, width in (("time", "⏰ 时间", 90), ("activity", "事项", 180), ("location", "📍 地点", 100)):
+            self.events_tree.heading(
+                column, text=heading, command=lambda c=column: self.sort_day_events(c)
+            )
+            self.events_tree.column(column, width=width, stretch=(column == "activity"))
+        self.events_tree.tag_configure('placeholder', foreground='gray')
+        self.events_tree.pack(side=tk.TOP, fill=tk.BOTH, expand=True)
+        self.events_scroll.config(command=self.events_tree.yview)
+
+        # 按住方向键快速移动时只显示最后选中项的详情
+        self.events_tree.bind("<<TreeviewSelect>>", lambda e: self.refresh.mark("detail"))
+        self.events_tree.bind("<Delete>", lambda e: self.delete_selected_event())
+        self.events_tree.bind("<BackSpace>", lambda e: self.delete_selected_event())
+        # 列表中的行 id -> 事件；排序列及是否倒序
+        self._tree_events = {}
+        self._event_sort = ("time", False)
+
         # 事项详情区域（下方）
         self.event_detail_frame = ttk.LabelFrame(
             self.event_paned,
@@ -297,24 +349,21 @@ class CalendarUI:
         self.create_calendar()
 
     def create_calendar(self):
-        """创建日历视图"""
-        for widget in self.calendar_frame.winfo_children():
-            widget.destroy()
-
-        year = int(self.year_var.get())
-        month = int(self.month_var.get())
-        today = datetime.now()
+        """创建日历视图
 
+        标题、星期行和 6×7 个日期单元格只创建一次，之后切换月份或增删事件时
+        由 render_calendar / refresh_calendar_days 只更新有变化的单元格。
+        """
         # 日历标题
         title_frame = ttk.Frame(self.calendar_frame)
         title_frame.pack(fill=tk.X, pady=(0, 5))
 
-        ttk.Label(
+        self.calendar_title = ttk.Label(
             title_frame,
-            text=f"{calendar.month_name[month]} {year}",
             style='Header.TLabel',
             font=('Arial', 10, 'bold')
-        ).pack()
+        )
+        self.calendar_title.pack()
 
         # 星期标题
         weekdays_frame = ttk.Frame(self.calendar_frame)
@@ -330,90 +379,241 @@ class CalendarUI:
                 style='Header.TLabel'
             ).pack(side=tk.LEFT, expand=True)
 
-        # 日历日期
-        cal = calendar.monthcalendar(year, month)
-        for week in cal:
+        # 日历日期：按钮绑定单元格序号，点击时再查当前月份对应的日期，切换月份无需改 command
+        self._week_frames = []
+        self._day_buttons = []
+        for week in range(6):
             week_frame = ttk.Frame(self.calendar_frame)
             week_frame.pack(fill=tk.X, pady=1)
+            self._week_frames.append(week_frame)
 
-            for day in week:
+            for weekday in range(7):
                 day_frame = ttk.Frame(week_frame, width=70, height=60)
                 day_frame.pack_propagate(0)
                 day_frame.pack(side=tk.LEFT, expand=True, fill=tk.BOTH)
 
-                if day == 0:
-                    continue
-
-                has_event = self.event_manager.has_events_on_day(day, year, month)
-                is_today = (day == today.day and month == today.month and year == today.year)
-
-                btn_style = 'Today.TButton' if is_today else ('Event.TButton' if has_event else 'TButton')
-                
-                day_btn = ttk.Button(
+                self._day_buttons.append(ttk.Button(
                     day_frame,
-                    text=str(day),
                     padding=2,
-                    command=lambda d=day, y=year, m=month: self.show_day_events(d, y, m),
-                    style=btn_style
+                    command=lambda i=week * 7 + weekday: self._on_day_cell_click(i)
+                ))
+
+        # 当前显示的 (年, 月)、可见周数、每个单元格的日期(0 为空白)和已显示的 (文字, 样式)
+        self._shown_month = None
+        self._visible_weeks = 6
+        self._cell_days = [0] * 42
+        self._cell_state = [None] * 42
+        self._day_cell_index = {}
+        self.render_calendar()
+
+    def render_calendar(self):
+        """显示 年份/月份 输入框指定的月份，只重新设置有变化的单元格"""
+        year = int(self.year_var.get())
+        month = int(self.month_var.get())
+
+        self.event_manager.set_view_window(year, month)
+        weeks = calendar.monthcalendar(year, month)
+        month_summary = self.event_manager.get_month_summary(year, month)
+
+        if self._shown_month != (year, month):
+            self._shown_month = (year, month)
+            self.calendar_title.config(text=f"{calendar.month_name[month]} {year}")
+            self._set_visible_weeks(len(weeks))
+            self._cell_days = [day for week in weeks for day in week]
+            self._cell_days += [0] * (42 - len(self._cell_days))
+            self._day_cell_index = {day: i for i, day in enumerate(self._cell_days) if day}
+
+        today = datetime.now()
+        for index, day in enumerate(self._cell_days):
+            self._update_day_cell(index, day, month_summary, today)
+
+    def refresh_calendar_days(self, year, month, days):
+        """事件增删后标记受影响日期的单元格，稍后统一重新设置样式"""
+        self.refresh.mark("days", ((year, month, day) for day in days))
+
+    def _redraw_days(self, dirty_days):
+        days_by_month = {}
+        for year, month, day in dirty_days:
+            days_by_month.setdefault((year, month), []).append(day)
+
+        today = datetime.now()
+        for (year, month), days in days_by_month.items():
+            if self.multi_month_view is not None:
+                self.multi_month_view.invalidate(year, month)
+            if self._shown_month != (year, month):
+                continue
+            month_summary = self.event_manager.get_month_summary(year, month)
+            for day in days:
+                index = self._day_cell_index.get(day)
+                if index is not None:
+                    self._update_day_cell(index, day, month_summary, today)
+
+    def refresh_event_days(self, events):
+        """按事件所在日期刷新受影响的单元格"""
+        days_by_month = {}
+        for event in events:
+            days_by_month.setdefault((event.year, event.month), set()).add(event.day)
+        for (year, month), days in days_by_month.items():
+            self.refresh_calendar_days(year, month, days)
+
+    def toggle_continuous_view(self):
+        """在单月网格和可连续滚动的多月画布视图之间切换"""
+        self.refresh.flush()
+        if self.continuous_var.get():
+            self.calendar_vscroll.pack_forget()
+            self.calendar_hscroll.pack_forget()
+            self.calendar_canvas.pack_forget()
+            if self.multi_month_view is None:
+                self.multi_month_view = CanvasCalendar(
+                    self.calendar_container,
+                    self.event_manager.get_month_summary,
+                    self.show_day_events
                 )
+            else:
+                # 隐藏期间的修改只清除了缓存，重新读取统计
+                self.multi_month_view.invalidate_all()
+            self.multi_month_view.pack(fill=tk.BOTH, expand=True)
+            self.multi_month_view.scroll_to(*self._shown_month)
+        else:
+            self.multi_month_view.pack_forget()
+            self.calendar_vscroll.pack(side=tk.RIGHT, fill=tk.Y)
+            self.calendar_hscroll.pack(side=tk.BOTTOM, fill=tk.X)
+            self.calendar_canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+    def _set_visible_weeks(self, count):
+        """月份跨 4~6 周，多余的周行隐藏而不是销毁"""
+        for week in range(count, self._visible_weeks):
+            self._week_frames[week].pack_forget()
+        for week in range(self._visible_weeks, count):
+            self._week_frames[week].pack(fill=tk.X, pady=1, after=self._week_frames[week - 1])
+        self._visible_weeks = count
+
+    def _update_day_cell(self, index, day, month_summary, today):
+        if day == 0:
+            state = None
+        else:
+            year, month = self._shown_month
+            is_today = (day == today.day and month == today.month and year == today.year)
+            has_event = day in month_summary
+            btn_style = 'Today.TButton' if is_today else ('Event.TButton' if has_event else 'TButton')
+            state = (str(day), btn_style)
+
+        previous = self._cell_state[index]
+        if state == previous:
+            return
+        day_btn = self._day_buttons[index]
+        if state is None:
+            day_btn.pack_forget()
+        else:
+            day_btn.config(text=state[0], style=state[1])
+            if previous is None:
                 day_btn.pack(fill=tk.BOTH, expand=True, padx=2, pady=2)
+        self._cell_state[index] = state
+
+    def _on_day_cell_click(self, index):
+        day = self._cell_days[index]
+        if day:
+            year, month = self._shown_month
+            self.show_day_events(day, year, month)
 
     def show_day_events(self, day, year, month):
         """显示选定日期的事件"""
         self.selected_day = (day, year, month)
-
-        # 清除现有事件显示
-        for widget in self.events_inner_frame.winfo_children():
-            widget.destroy()
+        if self.multi_month_view is not None:
+            self.multi_month_view.select(day, year, month)
 
         day_events = self.event_manager.get_day_events(day, year, month)
+        self._populate_events_tree(day_events)
 
         if not day_events:
-            ttk.Label(
-                self.events_inner_frame,
-                text=f"{year}年{month}月{day}日没有安排",
-                foreground='gray',
-                font=('Arial', 10, 'italic')
-            ).pack(anchor='w', pady=10)
+            self.events_tree.insert(
+                "", tk.END, values=("", f"{year}年{month}月{day}日没有安排", ""),
+                tags=('placeholder',)
+            )
             self.btn_delete_day.config(state='disabled')
+            self.btn_delete_event.config(state='disabled')
             self.detail_text.config(state='normal')
             self.detail_text.delete(1.0, tk.END)
             self.detail_text.config(state='disabled')
             return
         else:
             self.btn_delete_day.config(state='normal')
+            self.btn_delete_event.config(state='normal')
+
+        # 选中并显示第一个事件的详情，方向键可继续切换
+        first = self.events_tree.get_children()[0]
+        self.events_tree.selection_set(first)
+        self.events_tree.focus(first)
+        self.events_tree.see(first)
+
+    def _populate_events_tree(self, day_events):
+        self.events_tree.delete(*self.events_tree.get_children())
+        column, reverse = self._event_sort
+        if column == "activity":
+            day_events = sorted(day_events, key=lambda e: e.activity, reverse=reverse)
+        elif column == "location":
+            day_events = sorted(day_events, key=lambda e: e.location, reverse=reverse)
+        else:
+            # 重新排序时传入的是当前显示顺序（可能已按其他列排序），不能只做反转
+            day_events = sorted(day_events, key=lambda e: e.sort_key, reverse=reverse)
 
-        # 添加事件按钮
+        self._tree_events = {}
         for event in day_events:
-            event_frame = ttk.Frame(self.events_inner_frame)
-            event_frame.pack(fill='x', pady=2, padx=5)
-
-            ttk.Button(
-                event_frame,
-                text=f"⏰ {event['time']} - {event['activity']}",
-                command=lambda e=event: self.show_event_detail(e),
-                style='TButton'
-            ).pack(side=tk.LEFT, expand=True, fill=tk.X)
-
-            ttk.Button(
-                event_frame,
-                text="✕",
-                command=lambda e=event: self.delete_single_event(e),
-                width=3,
-                style='Danger.TButton'
-            ).pack(side=tk.LEFT, padx=(5, 0))
-
-        # 显示第一个事件的详情
-        if day_events:
-            self.show_event_detail(day_events[0])
+            iid = self.events_tree.insert(
+                "", tk.END, values=(event.time, event.activity, event.location)
+            )
+            self._tree_events[iid] = event
+
+    def sort_day_events(self, column):
+        """点击列标题排序，再次点击同一列切换升序/降序"""
+        current, reverse = self._event_sort
+        self._event_sort = (column, not reverse if column == current else False)
+        if self._tree_events:
+            selected = self._selected_event()
+            self._populate_events_tree(list(self._tree_events.values()))
+            for iid, event in self._tree_events.items():
+                if event is selected:
+                    self.events_tree.selection_set(iid)
+                    self.events_tree.see(iid)
+                    break
+
+    def _selected_event(self):
+        selection = self.events_tree.selection()
+        return self._tree_events.get(selection[0]) if selection else None
+
+    def _redraw_day_list(self, _items=None):
+        if not self.selected_day:
+            return
+        self.show_day_events(*self.selected_day)
+        index, self._select_index = self._select_index, None
+        rows = [iid for iid in self.events_tree.get_children() if iid in self._tree_events]
+        if index is not None and rows:
+            row = rows[min(index, len(rows) - 1)]
+            self.events_tree.selection_set(row)
+            self.events_tree.focus(row)
+            self.events_tree.see(row)
+
+    def _on_event_selected(self, _items=None):
+        event = self._selected_event()
+        if event is not None:
+            self.show_event_detail(event)
+
+    def delete_selected_event(self):
+        """删除选中的事项，之后选中同一位置的下一项，便于连续用键盘删除"""
+        event = self._selected_event()
+        if event is None:
+            return
+        self._select_index = self.events_tree.index(self.events_tree.selection()[0])
+        self.delete_single_event(event)
 
     def delete_single_event(self, event):
         """删除单个事件"""
-        if messagebox.askyesno("确认删除", f"确定要删除事项 '{event['activity']}' 吗？"):
+        if messagebox.askyesno("确认删除", f"确定要删除事项 '{event.activity}' 吗？"):
             if self.event_manager.delete_event(event):
-                self.event_manager.save_events_to_log()
-                self.update_calendar()
-                self.show_day_events(event["day"], event["year"], event["month"])
+                self.event_manager.schedule_save()
+                self.refresh_event_days([event])
+                self.selected_day = (event.day, event.year, event.month)
+                self.refresh.mark("day_list")
                 messagebox.showinfo("成功", "事项已删除")
 
     def delete_day_events(self):
@@ -425,9 +625,9 @@ class CalendarUI:
         
         if messagebox.askyesno("确认删除", f"确定要删除{year}年{month}月{day}日的所有事项吗？"):
             if self.event_manager.delete_day_events(day, year, month):
-                self.event_manager.save_events_to_log()
-                self.update_calendar()
-                self.show_day_events(day, year, month)
+                self.event_manager.schedule_save()
+                self.refresh_calendar_days(year, month, [day])
+                self.refresh.mark("day_list")
 
     def show_event_detail(self, event):
         """显示事件详情"""
@@ -435,102 +635,158 @@ class CalendarUI:
         self.detail_text.delete(1.0, tk.END)
 
         details = (
-            f"📌 事项: {event['activity']}\n\n"
-            f"🕒 时间: {event['time']}\n\n"
-            f"📍 地点: {event['location']}\n\n"
-            f"📅 日期: {event['year']}年{event['month']}月{event['day']}日"
+            f"📌 事项: {event.activity}\n\n"
+            f"🕒 时间: {event.time}\n\n"
+            f"📍 地点: {event.location}\n\n"
+            f"📅 日期: {event.year}年{event.month}月{event.day}日"
         )
         self.detail_text.insert(tk.END, details)
         self.detail_text.config(state='disabled')
 
+    def set_api_handler(self, api_handler):
+        """API 客户端在后台创建完成后（主线程中）调用"""
+        self.api_handler = api_handler
+        retried, self._api_retry = self._api_retry, None
+        if api_handler.api_key and not self.api_entry.get():
+            self.api_entry.insert(0, api_handler.api_key)
+        self.btn_update_api.config(state='normal', text="更新密钥")
+        self.btn_analyze.config(state='normal')
+        new_key = self.api_entry.get()
+        if retried and new_key and new_key != api_handler.api_key:
+            # 重试前用户已输入新密钥，客户端就绪后继续验证
+            self.update_api()
+
+    def set_api_unavailable(self, retry):
+        """API 客户端创建失败（主线程中）调用；点击“更新密钥”时调用 retry() 重新创建"""
+        self._api_retry = retry
+        self.btn_update_api.config(state='normal', text="更新密钥")
+
     def update_api(self):
         """更新API密钥"""
+        if self.api_handler is None:
+            if self._api_retry is not None:
+                self.btn_update_api.config(state='disabled', text="初始化中...")
+                self._api_retry()
+            return
         new_key = self.api_entry.get()
-        success, message = self.api_handler.update_api_key(new_key)
+        self.btn_update_api.config(state='disabled', text="验证中...")
+
+        # 验证需要一次网络请求，放到后台执行以免界面卡住；结果交给主线程显示
+        self.api_handler.update_api_key_async(
+            new_key, self.dispatcher.wrap(self._on_api_key_validated)
+        )
+
+    def _on_api_key_validated(self, success, message):
+        self.btn_update_api.config(state='normal', text="更新密钥")
         if success:
             messagebox.showinfo("成功", message)
         else:
             messagebox.showerror("错误", message)
 
-    def analyze_text(self):
-        """分析文本并提取事件"""
-        if self.is_analyzing:
+    def analyze_text(self, source="manual"):
+        """分析文本并提取事件
+
+        分析进行中再次提交的请求会排队而不是被丢弃；source 相同的后一个请求
+        会取代前一个尚未完成的请求（如连续选中的文本）。
+        """
+        if self.api_handler is None:
+            messagebox.showinfo("提示", "API 客户端正在初始化，请稍后再试")
             return
-            
+        # api_client 依赖 openai，启动时不导入；客户端创建后模块已加载
+        from core.api_client import CANCELLED_MESSAGE
+
         text = self.text_input.get("1.0", tk.END).strip()
         if not text:
             messagebox.showwarning("警告", "请输入要分析的文本内容")
             return
 
-        self.is_analyzing = True
-        self.btn_analyze.config(state='disabled', text="分析中...")
-        
+        self.pending_analyses += 1
+        self._update_analyze_button()
+        # 流式事件先行加入日历；请求被取代或最终结果校验失败时撤回
+        stream = {"events": [], "open": True}
+
+        def streamed_event(event_data):
+            if stream["open"]:
+                self._add_streamed_event(event_data, stream["events"])
+
         def analysis_callback(success, result):
-            self.is_analyzing = False
-            self.btn_analyze.config(state='normal', text="🔍 分析文本")
+            stream["open"] = False
+            self.pending_analyses -= 1
+            self._update_analyze_button()
+            if not success and result == CANCELLED_MESSAGE:
+                self._rollback_streamed_events(stream["events"])
+                return
             if success:
                 try:
                     parsed_response = json.loads(result)
                     self.parse_events(parsed_response)
-                    self.event_manager.save_events_to_log()
+                    self.event_manager.schedule_save()
                     messagebox.showinfo("成功", "文本分析完成！")
+                    return
                 except json.JSONDecodeError:
-                    messagebox.showerror("错误", "API返回了无效的JSON格式")
+                    error = "API返回了无效的JSON格式"
+                except (ValueError, TypeError, KeyError) as e:
+                    error = f"解析事件失败: {str(e)}"
             else:
-                messagebox.showerror("错误", result)
+                error = result
+            self._rollback_streamed_events(stream["events"])
+            messagebox.showerror("错误", error)
+
+        # 两个回调都可能在工作线程中调用，经调度队列在主线程执行
+        channel = None if source == "manual" else source
+        self.api_handler.analyze_text_async(
+            text,
+            self.dispatcher.wrap(analysis_callback),
+            channel=channel,
+            on_event=self.dispatcher.wrap(streamed_event)
+        )
 
-        self.api_handler.analyze_text_async(text, analysis_callback)
+    def _add_streamed_event(self, event_data, added):
+        """流式分析中每解析出一个事件就立即加入日历，并记入 added 以便撤回"""
+        event = Event.from_api(event_data)
+        if event is not None and self.event_manager.add_event(event):
+            added.append(event)
+            self.refresh_event_days([event])
+
+    def _rollback_streamed_events(self, events):
+        if not events:
+            return
+        for event in events:
+            self.event_manager.delete_event(event)
+        self.refresh_event_days(events)
+        self.refresh.mark("day_list")
+        self.event_manager.schedule_save()
+
+    def _update_analyze_button(self):
+        if self.pending_analyses:
+            self.btn_analyze.config(text=f"分析中({self.pending_analyses})...")
+        else:
+            self.btn_analyze.config(text="🔍 分析文本")
 
     def parse_events(self, api_response):
         """解析API返回的事件数据"""
         try:
-            if isinstance(api_response, str):
-                api_response = json.loads(api_response)
-            
-            events_data = api_response
-            if isinstance(api_response, dict):
-                if 'events' in api_response:
-                    events_data = api_response['events']
-                else:
-                    events_data = [api_response]
-            
-            for event in events_data:
-                try:
-                    date_str = event.get("date") or event.get("日期")
-                    if not date_str:
-                        continue
-
-                    date_parts = date_str.split("-")
-                    if len(date_parts) != 3:
-                        continue
-
-                    year, month, day = map(int, date_parts)
-                    new_event = {
-                        "date": date_str,
-                        "year": year,
-                        "month": month,
-                        "day": day,
-                        "location": event.get("location", event.get("地点", "未指定")),
-                        "time": event.get("time", event.get("时间", "未指定")),
-                        "activity": event.get("activity", event.get("事项", "未指定"))
-                    }
-                    
-                    self.event_manager.add_event(new_event)
-                        
-                except (ValueError, AttributeError, KeyError):
-                    continue
-            
-            self.update_calendar()
+            new_events = Event.from_api_response(api_response)
+            added, duplicates = self.event_manager.add_events(new_events)
+            print(f"新增 {added} 个事件，跳过 {duplicates} 个重复事件")
+
+            self.refresh_event_days(new_events)
             today = datetime.now()
-            self.show_day_events(today.day, today.year, today.month)
+            self.selected_day = (today.day, today.year, today.month)
+            self.refresh.mark("day_list")
             
         except Exception as e:
             print(f"Error parsing events: {str(e)}")
             raise
 
     def update_calendar(self):
-        """更新日历显示"""
-        self.create_calendar()
+        """更新日历显示（连续点击年份/月份时合并为一次重绘）"""
+        self.refresh.mark("grid")
+
+    def _redraw_grid(self, _items=None):
+        self.render_calendar()
+        if self.continuous_var.get():
+            self.multi_month_view.scroll_to(*self._shown_month)
 
     def go_to_today(self):
         """跳转到今天"""
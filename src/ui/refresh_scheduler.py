@@ -0,0 +1,44 @@
+# refresh_scheduler.py
+
+
+class RefreshScheduler:
+    """合并界面刷新请求
+
+    各处修改数据后只调用 mark(区域, 条目) 标记需要刷新的区域（如日历网格、
+    某几天的单元格、当天事项列表），同一轮事件处理中的多次标记合并为一次
+    after_idle 回调，按注册顺序每个区域只重绘一次。
+    """
+
+    def __init__(self, widget):
+        self.widget = widget
+        # [(区域, 回调)]，回调参数为该区域累积的条目集合
+        self._handlers = []
+        self._dirty = {}
+        self._scheduled = None
+        self.marks = 0
+        self.flushes = 0
+
+    def register(self, region, callback):
+        self._handlers.append((region, callback))
+
+    def mark(self, region, items=()):
+        self.marks += 1
+        self._dirty.setdefault(region, set()).update(items)
+        if self._scheduled is None:
+            self._scheduled = self.widget.after_idle(self.flush)
+
+    def flush(self):
+        """立即执行所有待刷新的区域"""
+        if self._scheduled is not None:
+            self.widget.after_cancel(self._scheduled)
+            self._scheduled = None
+        dirty, self._dirty = self._dirty, {}
+        if not dirty:
+            return
+        self.flushes += 1
+        for region, callback in self._handlers:
+            if region in dirty:
+                try:
+                    callback(dirty[region])
+                except Exception as e:
+                    print(f"刷新 {region} 失败: {str(e)}")
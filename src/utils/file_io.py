@@ -0,0 +1,74 @@
+# file_io.py
+import json
+import os
+import tempfile
+
+
+def atomic_write_json(path, data, **dump_kwargs):
+    """先写入同目录临时文件并 fsync，再原子替换目标文件
+
+    写入过程中崩溃不会破坏原文件。
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(
+        prefix=os.path.basename(path) + ".", suffix=".tmp", dir=directory
+    )
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, **dump_kwargs)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def truncate_partial_line(path):
+    """截掉文件末尾没有换行符的不完整行（写入中断留下的），返回截掉的字节数
+
+    之后以追加方式写入的记录才不会接在残行后面而无法解析。
+    """
+    if not os.path.exists(path):
+        return 0
+    with open(path, 'rb+') as f:
+        size = f.seek(0, os.SEEK_END)
+        if size == 0:
+            return 0
+        f.seek(size - 1)
+        if f.read(1) == b"\n":
+            return 0
+        # 从末尾向前按块查找最后一个换行符
+        end = size
+        while end > 0:
+            start = max(0, end - 4096)
+            f.seek(start)
+            newline = f.read(end - start).rfind(b"\n")
+            if newline != -1:
+                keep = start + newline + 1
+                break
+            end = start
+        else:
+            keep = 0
+        f.truncate(keep)
+        f.flush()
+        os.fsync(f.fileno())
+        return size - keep
+
+
+def read_json_lines(path):
+    """逐行读取 JSON Lines 文件，跳过空行和损坏的行（如写入中断的最后一行）"""
+    if not os.path.exists(path):
+        return
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
@@ -0,0 +1,208 @@
+# stub_api.py
+"""本地 DeepSeek 兼容桩服务，用于在不访问真实 API 的情况下测试重试、熔断和批量导入
+
+用法（在 src 目录下）：
+    python -m utils.stub_api --port 8765 --fail 2 --status 503 --retry-after 1
+然后以 base_url="http://127.0.0.1:8765/v1" 创建 APIClient。
+"""
+import argparse
+import json
+import re
+import threading
+import time
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SNIPPET_RE = re.compile(r"【片段 ([^】]+)】\n(.*?)(?=\n\n【片段 |\Z)", re.S)
+
+
+class _Server(ThreadingHTTPServer):
+    # 并发压测时默认的 listen 队列(5)会导致连接被拒绝
+    request_queue_size = 1024
+    daemon_threads = True
+
+
+def canned_events(text):
+    """默认应答：每段文本固定返回一个今天 09:00 的事件，事项取文本开头
+
+    不依赖被测代码（如本地规则抽取器），不同文本得到不同事件。
+    """
+    return [{
+        "日期": date.today().isoformat(),
+        "地点": "未指定",
+        "时间": "09:00",
+        "事项": " ".join(text.split())[:20] or "未命名事项",
+    }]
+
+
+class StubAPIServer:
+    """在后台线程中运行的桩服务
+
+    前 fail 个补全请求返回 status 错误（可带 Retry-After），invalid_json 个请求
+    返回无法解析的内容，之后返回 responder(文本) 给出的事件列表。
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, fail=0, status=503, retry_after=None,
+                 invalid_json=0, latency=0.0, responder=canned_events):
+        self.fail = fail
+        self.status = status
+        self.retry_after = retry_after
+        self.invalid_json = invalid_json
+        self.latency = latency
+        self.requests = 0
+        self.responder = responder
+        self._lock = threading.Lock()
+        self._thread = None
+        self.httpd = _Server((host, port), self._make_handler())
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def _next_outcome(self):
+        """按请求顺序决定本次返回错误、无效 JSON 还是正常结果"""
+        with self._lock:
+            self.requests += 1
+            if self.fail > 0:
+                self.fail -= 1
+                return "error"
+            if self.invalid_json > 0:
+                self.invalid_json -= 1
+                return "invalid"
+            return "ok"
+
+    def _answer(self, prompt):
+        text = prompt.rsplit("待分析文本：\n", 1)[-1]
+        snippets = SNIPPET_RE.findall(text)
+        if snippets:
+            results = [
+                {"id": snippet_id, "events": self.responder(snippet.strip())}
+                for snippet_id, snippet in snippets
+            ]
+            return json.dumps({"results": results}, ensure_ascii=False)
+        return json.dumps({"events": self.responder(text.strip())}, ensure_ascii=False)
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # 响应头和响应体分两次写出，关闭 Nagle 避免与延迟确认叠加出 40ms 停顿
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status, payload, headers=None):
+                body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path.rstrip("/").endswith("/models"):
+                    self._send_json(200, {"object": "list", "data": [
+                        {"id": "deepseek-chat", "object": "model", "owned_by": "stub"}
+                    ]})
+                else:
+                    self._send_json(404, {"error": {"message": "not found"}})
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self._send_json(404, {"error": {"message": "not found"}})
+                    return
+                if server.latency:
+                    time.sleep(server.latency)
+
+                outcome = server._next_outcome()
+                if outcome == "error":
+                    headers = {}
+                    if server.retry_after is not None:
+                        headers["Retry-After"] = str(server.retry_after)
+                    self._send_json(server.status, {"error": {
+                        "message": "stub failure", "type": "server_error"
+                    }}, headers)
+                    return
+
+                prompt = request.get("messages", [{}])[-1].get("content", "")
+                content = "{\"events\": [" if outcome == "invalid" else server._answer(prompt)
+                if request.get("stream"):
+                    self._send_stream(content)
+                else:
+                    self._send_json(200, {
+                        "id": "stub",
+                        "object": "chat.completion",
+                        "created": int(time.time()),
+                        "model": request.get("model", "deepseek-chat"),
+                        "choices": [{
+                            "index": 0,
+                            "message": {"role": "assistant", "content": content},
+                            "finish_reason": "stop",
+                        }],
+                    })
+
+            def _send_stream(self, content):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                for start in range(0, len(content), 16):
+                    chunk = {
+                        "id": "stub",
+                        "object": "chat.completion.chunk",
+                        "created": int(time.time()),
+                        "model": "deepseek-chat",
+                        "choices": [{
+                            "index": 0,
+                            "delta": {"content": content[start:start + 16]},
+                            "finish_reason": None,
+                        }],
+                    }
+                    self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode('utf-8'))
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+                self.close_connection = True
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地 DeepSeek 兼容桩服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--fail", type=int, default=0, help="前 N 个请求返回错误")
+    parser.add_argument("--status", type=int, default=503, help="错误请求的状态码")
+    parser.add_argument("--retry-after", type=float, default=None, help="错误响应的 Retry-After 秒数")
+    parser.add_argument("--invalid-json", type=int, default=0, help="随后 N 个请求返回无效 JSON")
+    parser.add_argument("--latency", type=float, default=0.0, help="每个请求的模拟延迟（秒）")
+    args = parser.parse_args()
+
+    server = StubAPIServer(args.host, args.port, args.fail, args.status, args.retry_after,
+                           args.invalid_json, args.latency)
+    print(f"桩服务已启动: {server.base_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
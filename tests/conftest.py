@@ -0,0 +1,6 @@
+# conftest.py
+import os
+import sys
+
+# 程序在 src 目录下以 core.*、utils.* 等顶层包运行，测试保持一致
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
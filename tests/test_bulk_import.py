@@ -0,0 +1,38 @@
+# test_bulk_import.py
+import pytest
+
+# APIClient 依赖 openai/httpx，未安装时跳过
+pytest.importorskip("openai")
+
+from core.api_client import APIClient
+from core.bulk_import import BulkImporter, iter_snippets
+from core.event_manager import EventManager
+from utils.stub_api import StubAPIServer, canned_events
+
+
+def _responder(text):
+    # 含“坏”字的片段模拟模型返回 {"events": null}
+    return None if "坏" in text else canned_events(text)
+
+
+def test_bad_results_are_counted_as_failures(tmp_path):
+    notes = tmp_path / "notes.txt"
+    notes.write_text("周会\n\n坏结果\n\n评审\n", encoding='utf-8')
+    server = StubAPIServer(responder=_responder).start()
+    api_handler = APIClient(
+        api_key_file=str(tmp_path / "api_key.json"), cache_file=None, local_fast_path=False,
+        base_url=server.base_url, async_engine=True, async_concurrency=4,
+    )
+    api_handler.set_api_key("stub")
+    event_manager = EventManager(str(tmp_path / "calendar_events.log"), lazy=True)
+    importer = BulkImporter(api_handler, event_manager, parallelism=2)
+    try:
+        added, duplicates = importer.run(iter_snippets([str(notes)]), save=False)
+    finally:
+        api_handler.close()
+        server.stop()
+
+    assert importer.snippets == 3
+    assert importer.failures == 1
+    assert (added, duplicates) == (2, 0)
+    assert sorted(e.activity for e in importer.events) == ["周会", "评审"]
@@ -0,0 +1,68 @@
+# test_event_manager.py
+import json
+import os
+
+from core.event_manager import EventManager
+from core.models import Event
+
+
+def test_failed_month_load_does_not_overwrite_shard(tmp_path):
+    log_file = str(tmp_path / "calendar_events.log")
+    manager = EventManager(log_file, lazy=True)
+    manager.add_events([Event(2025, 3, day, "10:00", "会议室", f"事项{day}") for day in range(1, 6)])
+    manager.save_events_to_log()
+
+    shard = os.path.join(log_file + ".d", "2025-03.json")
+    with open(shard, 'r', encoding='utf-8') as f:
+        original = f.read()
+    with open(shard, 'w', encoding='utf-8') as f:
+        f.write(original[:40])
+
+    manager = EventManager(log_file, lazy=True)
+    manager.add_event(Event(2025, 3, 9, "10:00", "会议室", "新事项"))
+    manager.save_events_to_log()
+    with open(shard, 'r', encoding='utf-8') as f:
+        assert f.read() == original[:40]
+
+    # 分片恢复后，暂存的修改与原有事件一起保存
+    with open(shard, 'w', encoding='utf-8') as f:
+        f.write(original)
+    manager.save_events_to_log()
+    with open(shard, 'r', encoding='utf-8') as f:
+        assert len(json.load(f)) == 6
+
+
+def test_corrupt_log_migration_is_retried(tmp_path):
+    log_file = tmp_path / "calendar_events.log"
+    log_file.write_text('[{"year": 2025, "month": 3', encoding='utf-8')
+
+    # 日志损坏时照常启动，不修改原日志，也不写入 index.json
+    manager = EventManager(str(log_file), lazy=True)
+    assert manager.get_day_events(1, 2025, 3) == []
+    manager.add_event(Event(2025, 3, 2, "10:00", "会议室", "新事项"))
+    manager.save_events_to_log()
+    assert log_file.read_text(encoding='utf-8') == '[{"year": 2025, "month": 3'
+    assert not os.path.exists(os.path.join(str(log_file) + ".d", "index.json"))
+
+    # 日志修复后重新迁移，并与上次运行中保存的事件合并
+    log_file.write_text(json.dumps([Event(2025, 3, 1, "09:00", "会议室", "周会").to_dict()]),
+                        encoding='utf-8')
+    manager = EventManager(str(log_file), lazy=True)
+    assert manager.get_month_summary(2025, 3) == {1: 1, 2: 1}
+    assert os.path.exists(os.path.join(str(log_file) + ".d", "index.json"))
+
+
+def test_corrupt_index_is_rebuilt_from_shards(tmp_path):
+    log_file = str(tmp_path / "calendar_events.log")
+    manager = EventManager(log_file, lazy=True)
+    manager.add_events([Event(2025, 3, 1, "10:00", "会议室", "周会"),
+                        Event(2025, 4, 5, "10:00", "会议室", "评审")])
+    manager.save_events_to_log()
+
+    with open(os.path.join(log_file + ".d", "index.json"), 'w', encoding='utf-8') as f:
+        f.write('{"2025-03": {"1"')
+
+    manager = EventManager(log_file, lazy=True)
+    assert manager.get_month_summary(2025, 3) == {1: 1}
+    assert manager.has_events_on_day(5, 2025, 4)
+    assert [e.activity for e in manager.get_day_events(1, 2025, 3)] == ["周会"]
@@ -0,0 +1,57 @@
+# test_local_extractor.py
+from datetime import date
+
+import pytest
+
+from core.local_extractor import LocalEventExtractor, _to_int
+
+
+@pytest.fixture
+def extractor():
+    return LocalEventExtractor(today=date(2025, 3, 3))
+
+
+def test_to_int_multi_character_numerals():
+    assert [_to_int(t) for t in ["零五", "十", "十五", "二十五", "三十一", "一二"]] == [5, 10, 15, 25, 31, 12]
+    with pytest.raises(ValueError):
+        _to_int("十十")
+
+
+def test_minutes_with_leading_zero(extractor):
+    events, confidence = extractor.extract("明天十点零五分 会议室 评审")
+    assert events[0]["时间"] == "10:05"
+    assert confidence == 1.0
+
+
+@pytest.mark.parametrize("text", [
+    "明天下午3点和老板在会议室谈加薪",
+    "明天 会议室 晚上8点前交报告",
+    "明天两点 会议室 评审",
+])
+def test_ambiguous_inputs_fall_back_to_api(extractor, text):
+    _, confidence = extractor.extract(text)
+    assert confidence < 0.8
+
+
+def test_simple_input_stays_local(extractor):
+    events, confidence = extractor.extract("明天下午3点在会议室开会")
+    assert confidence == 1.0
+    assert (events[0]["时间"], events[0]["地点"], events[0]["事项"]) == ("15:00", "会议室", "开会")
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("明天晚上12点 上线", "24:00"),
+    ("明天凌晨12点 上线", "00:00"),
+    ("明天中午12点 午餐", "12:00"),
+    ("明天晚上11点 上线", "23:00"),
+])
+def test_twelve_oclock_follows_period(extractor, text, expected):
+    events, _ = extractor.extract(text)
+    assert events[0]["日期"] == "2025-03-04"
+    assert events[0]["时间"] == expected
+
+
+def test_past_midnight_falls_back_to_api(extractor):
+    # 晚上12点半已是次日凌晨，日期需要模型判断
+    _, confidence = extractor.extract("明天晚上12点半 上线")
+    assert confidence < 0.8
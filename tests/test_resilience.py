@@ -0,0 +1,184 @@
+# test_resilience.py
+import json
+import threading
+import time
+
+import pytest
+
+from core.resilience import CircuitBreaker, RetryPolicy, TokenBucket, call_with_resilience
+from utils.stub_api import StubAPIServer
+
+
+@pytest.fixture
+def stub(tmp_path):
+    # APIClient 依赖 openai/httpx，未安装时跳过
+    APIClient = pytest.importorskip("core.api_client").APIClient
+    servers = []
+    clients = []
+
+    def make(rate_limit=0, rate_burst=4, breaker_threshold=5, breaker_reset=30.0,
+             max_attempts=4, streaming=False, async_engine=False, **server_options):
+        server = StubAPIServer(**server_options).start()
+        servers.append(server)
+        api_key_file = tmp_path / "api_key.json"
+        api_key_file.write_text(json.dumps({"api_key": "stub"}), encoding='utf-8')
+        client = APIClient(
+            api_key_file=str(api_key_file), cache_file=None, local_fast_path=False,
+            base_url=server.base_url, max_attempts=max_attempts,
+            rate_limit=rate_limit, rate_burst=rate_burst,
+            breaker_threshold=breaker_threshold, breaker_reset=breaker_reset,
+            streaming=streaming, async_engine=async_engine,
+        )
+        # 退避时间缩短到毫秒级，Retry-After 仍按服务端要求等待
+        client.retry_policy = RetryPolicy(max_attempts=max_attempts, base_delay=0.01, max_delay=2.0)
+        clients.append(client)
+        return server, client
+
+    yield make
+    for client in clients:
+        client.close()
+    for server in servers:
+        server.stop()
+
+
+def _analyze(client, text, on_event=None):
+    """同步等待一次分析结果，返回 (成功, 内容)"""
+    done = threading.Event()
+    result = []
+
+    def callback(success, content):
+        result.append((success, content))
+        done.set()
+
+    client.analyze_text_async(text, callback, on_event=on_event)
+    assert done.wait(10), "分析请求超时"
+    return result[0]
+
+
+def test_retries_server_errors_with_backoff(stub):
+    server, client = stub(fail=2, status=503)
+    success, content = _analyze(client, "明天上午开会")
+    assert success
+    assert json.loads(content)["events"][0]["事项"] == "明天上午开会"
+    assert server.requests == 3
+    assert client.breaker.state == client.breaker.CLOSED
+
+
+def test_retry_after_is_honored_on_429(stub):
+    server, client = stub(fail=1, status=429, retry_after=0.3)
+    start = time.monotonic()
+    success, _ = _analyze(client, "周五交周报")
+    assert success
+    assert server.requests == 2
+    assert time.monotonic() - start >= 0.3
+
+
+def test_client_errors_are_not_retried(stub):
+    server, client = stub(fail=1, status=401)
+    success, _ = _analyze(client, "下周一复盘")
+    assert not success
+    assert server.requests == 1
+    # 401 不代表服务端不健康，不计入熔断
+    assert client.breaker.failures == 0
+
+
+def test_breaker_opens_then_half_opens_and_recovers(stub):
+    from core.api_client import UNAVAILABLE_MESSAGE
+    server, client = stub(fail=2, status=503, max_attempts=2,
+                          breaker_threshold=2, breaker_reset=0.3)
+    success, _ = _analyze(client, "第一次请求")
+    assert not success
+    assert server.requests == 2
+    assert client.breaker.state == client.breaker.OPEN
+
+    # 熔断期间直接短路，不再请求桩服务
+    assert _analyze(client, "第二次请求") == (False, UNAVAILABLE_MESSAGE)
+    assert server.requests == 2
+
+    # reset_timeout 之后放行一个探测请求，成功即关闭
+    time.sleep(0.35)
+    assert client.breaker.allow_request()
+    assert client.breaker.state == client.breaker.HALF_OPEN
+    client.breaker.abandon()
+    success, _ = _analyze(client, "第三次请求")
+    assert success
+    assert server.requests == 3
+    assert client.breaker.state == client.breaker.CLOSED
+
+
+def test_failed_half_open_probe_reopens_breaker(stub):
+    from core.api_client import UNAVAILABLE_MESSAGE
+    server, client = stub(fail=3, status=503, max_attempts=2,
+                          breaker_threshold=2, breaker_reset=0.3)
+    assert not _analyze(client, "第一次请求")[0]
+    time.sleep(0.35)
+    # 探测请求失败后立即重新打开，不再重试
+    assert not _analyze(client, "探测请求")[0]
+    assert server.requests == 3
+    assert client.breaker.state == client.breaker.OPEN
+    assert _analyze(client, "熔断中的请求") == (False, UNAVAILABLE_MESSAGE)
+    assert server.requests == 3
+
+
+def test_token_bucket_throttles_requests(stub):
+    server, client = stub(rate_limit=10, rate_burst=2)
+    start = time.monotonic()
+    for n in range(6):
+        assert _analyze(client, f"限流测试 {n}")[0]
+    elapsed = time.monotonic() - start
+    # 突发 2 个之后每秒 10 个：后 4 个请求至少等待 0.4 秒
+    assert elapsed >= 0.35
+    assert server.requests == 6
+
+
+def test_token_bucket_capacity_and_refill():
+    bucket = TokenBucket(rate=20, capacity=2)
+    assert bucket.try_acquire()
+    assert bucket.try_acquire()
+    assert not bucket.try_acquire()
+    assert not bucket.acquire(timeout=0.01)
+    start = time.monotonic()
+    assert bucket.acquire(timeout=1.0)
+    assert 0.01 <= time.monotonic() - start < 0.5
+
+
+@pytest.mark.parametrize("async_engine", [False, True])
+def test_both_engines_stream_events(stub, async_engine):
+    server, client = stub(fail=1, status=503, streaming=True, async_engine=async_engine)
+    streamed = []
+    success, content = _analyze(client, "明天上午开会", on_event=streamed.append)
+    assert success
+    assert streamed == json.loads(content)["events"]
+    assert server.requests == 2
+
+
+class _Outage(Exception):
+    pass
+
+
+def test_unretried_upstream_failures_still_open_breaker():
+    # 流式请求输出部分事件后断开：不重试，但应计入熔断
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30.0)
+
+    def fail():
+        raise _Outage()
+
+    for _ in range(2):
+        with pytest.raises(_Outage):
+            call_with_resilience(fail, RetryPolicy(max_attempts=3, base_delay=0), breaker=breaker,
+                                 is_retryable=lambda e: False, is_failure=lambda e: True)
+    assert breaker.state == breaker.OPEN
+
+
+def test_non_failure_errors_reset_breaker():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30.0)
+    breaker.record_failure()
+
+    def fail():
+        raise _Outage()
+
+    with pytest.raises(_Outage):
+        call_with_resilience(fail, RetryPolicy(max_attempts=3, base_delay=0), breaker=breaker,
+                             is_retryable=lambda e: False, is_failure=lambda e: False)
+    assert breaker.failures == 0
+    assert breaker.state == breaker.CLOSED
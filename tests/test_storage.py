@@ -0,0 +1,63 @@
+# test_storage.py
+import json
+
+from core.models import Event
+from core.storage import JournalStorage, SQLiteStorage
+
+
+def _event(day, activity):
+    return Event(2025, 3, day, "10:00", "会议室", activity)
+
+
+def test_journal_torn_last_line_is_truncated_before_append(tmp_path):
+    log_file = str(tmp_path / "calendar_events.log")
+    storage = JournalStorage(log_file)
+    first = _event(1, "周会")
+    storage.save([first], [("add", first)])
+
+    # 模拟写入中断：最后一条记录只写了一半，没有换行符
+    with open(storage.journal_file, 'a', encoding='utf-8') as f:
+        f.write('{"op":"add","event":{"year":2025,"mo')
+
+    storage = JournalStorage(log_file)
+    assert [e.activity for e in storage.load()] == ["周会"]
+
+    second = _event(2, "评审")
+    storage.save([first, second], [("add", second)])
+
+    reloaded = JournalStorage(log_file).load()
+    assert sorted(e.activity for e in reloaded) == ["周会", "评审"]
+
+
+def test_journal_append_without_load_after_torn_line(tmp_path):
+    log_file = str(tmp_path / "calendar_events.log")
+    storage = JournalStorage(log_file)
+    with open(storage.journal_file, 'w', encoding='utf-8') as f:
+        f.write('{"op":"add"')
+
+    event = _event(3, "复盘")
+    storage.save([event], [("add", event)])
+
+    assert [e.activity for e in JournalStorage(log_file).load()] == ["复盘"]
+
+
+def test_sqlite_retries_failed_migration(tmp_path):
+    log_file = tmp_path / "calendar_events.log"
+    db_file = str(tmp_path / "calendar_events.db")
+    log_file.write_text('[{"year": 2025, "month": 3', encoding='utf-8')
+
+    storage = SQLiteStorage(db_file, migrate_from=str(log_file))
+    assert storage.load() == []
+    storage.close()
+
+    # 修复日志后重新启动：数据库文件已存在，但迁移未完成，应再次迁移
+    log_file.write_text(json.dumps([_event(1, "周会").to_dict()]), encoding='utf-8')
+    storage = SQLiteStorage(db_file, migrate_from=str(log_file))
+    assert [e.activity for e in storage.load()] == ["周会"]
+    storage.close()
+
+    # 迁移完成后不再重复导入（已删除的事件不会从日志中恢复）
+    storage = SQLiteStorage(db_file, migrate_from=str(log_file))
+    storage.save([], [("delete", _event(1, "周会"))])
+    storage.close()
+    assert SQLiteStorage(db_file, migrate_from=str(log_file)).load() == []
@@ -0,0 +1,77 @@
+# test_stream_parser.py
+import json
+
+from core.stream_parser import IncrementalEventParser
+
+
+def _feed_by_char(text, parser=None):
+    """逐字符输入，记录每个事件在第几个字符处被返回"""
+    parser = parser or IncrementalEventParser()
+    events = []
+    for i, ch in enumerate(text):
+        for event in parser.feed(ch):
+            events.append((i, event))
+    return events
+
+
+def _event(activity, **extra):
+    return dict({"日期": "2025-03-01", "时间": "10:00", "地点": "会议室", "事项": activity}, **extra)
+
+
+def test_events_are_returned_as_soon_as_each_object_closes():
+    payload = {"events": [_event("周会"), _event("评审")]}
+    text = json.dumps(payload, ensure_ascii=False)
+    events = _feed_by_char(text)
+    assert [e for _, e in events] == payload["events"]
+    first_end = text.index("}")
+    assert events[0][0] == first_end
+
+
+def test_escaped_quotes_and_backslashes():
+    payload = {"events": [_event('讨论 "方案\\B" 的 \\"细节\\"'), _event("收尾")]}
+    text = json.dumps(payload, ensure_ascii=False)
+    assert [e for _, e in _feed_by_char(text)] == payload["events"]
+
+
+def test_braces_and_brackets_inside_strings():
+    payload = {"events": [_event("整理 {需求} 和 [清单]]"), _event("}]{[")]}
+    text = json.dumps(payload, ensure_ascii=False)
+    assert [e for _, e in _feed_by_char(text)] == payload["events"]
+
+
+def test_nested_objects_in_events():
+    payload = {"events": [
+        _event("出差", 参与人=[{"姓名": "张三", "备注": {"角色": "主讲"}}]),
+        _event("汇报", 附加={"events": [{"事项": "不应单独返回"}]}),
+    ]}
+    text = json.dumps(payload, ensure_ascii=False)
+    assert [e for _, e in _feed_by_char(text)] == payload["events"]
+
+
+def test_other_top_level_keys_before_events():
+    payload = {
+        "summary": "events",
+        "items": [{"事项": "不是事件"}],
+        "meta": {"events": [{"事项": "嵌套的同名键"}]},
+        "events": [_event("周会")],
+        "extra": [{"事项": "数组之后的内容"}],
+    }
+    text = json.dumps(payload, ensure_ascii=False, indent=2)
+    assert [e for _, e in _feed_by_char(text)] == payload["events"]
+
+
+def test_top_level_array():
+    payload = [_event("周会"), _event("评审")]
+    text = json.dumps(payload, ensure_ascii=False)
+    assert [e for _, e in _feed_by_char(text)] == payload
+
+
+def test_chunk_boundaries_do_not_matter():
+    payload = {"events": [_event('含 \\" 与 {括号}'), _event("第二项")]}
+    text = json.dumps(payload, ensure_ascii=False)
+    for size in (2, 3, 7, len(text)):
+        parser = IncrementalEventParser()
+        events = []
+        for start in range(0, len(text), size):
+            events.extend(parser.feed(text[start:start + size]))
+        assert events == payload["events"]